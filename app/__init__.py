@@ -1,4 +1,8 @@
 import os
+import time
+
+# Origin for the startup timings reported once the app is ready
+STARTED_AT = time.perf_counter()
 
 from dotenv import load_dotenv
 
@@ -7,10 +11,14 @@ load_dotenv(override=True)
 HOST = os.environ.get("HOST", "localhost")
 PORT = os.environ.get("PORT", 8000)
 ENV = os.environ.get("ENV", "production")
+WORKERS = int(os.environ.get("WORKERS", 1))
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", 1.5))
+STARTUP_STRICT = os.environ.get("STARTUP_STRICT", "false").lower() == "true"
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 SIGNING_SECRET = os.environ.get("SIGNING_SECRET")
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+GITHUB_WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET")
 
 POSTGRES_USERNAME = os.environ.get("POSTGRES_USERNAME")
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
@@ -20,6 +28,19 @@ POSTGRES_PORT = os.environ.get("POSTGRES_PORT")
 USER_SERVICE_DB = os.environ.get("USER_SERVICE_DB", "users_db")
 PAYMENT_SERVICE_DB = os.environ.get("PAYMENT_SERVICE_DB", "payments_db")
 
+# Per database: at most DB_POOL_SIZE connections, used from as many threads
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 4))
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", 5))
+DB_STATEMENT_TIMEOUT = float(os.environ.get("DB_STATEMENT_TIMEOUT", 120))
+DB_HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", 30))
+
+# Rows fetched per round trip by /get exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 5000))
+EXPORT_COPY_BUFFER = int(os.environ.get("EXPORT_COPY_BUFFER", 1 << 20))
+EXPORT_GZIP_LEVEL = int(os.environ.get("EXPORT_GZIP_LEVEL", 6))
+# Bytes read from the exported file per piece of its upload to Slack
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1 << 20))
+
 DEFAULT_PACKAGE_USERNAME = os.environ.get(
     "DEFAULT_PACKAGE_USERNAME", "interviewandhealth"
 )
@@ -41,6 +62,94 @@ DEFAULT_PRODUCTION_KUSTOMIZATION = os.environ.get(
     "DEFAULT_PRODUCTION_KUSTOMIZATION", "production/kustomization.yaml"
 )
 
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_GRAPHQL = os.environ.get("GITHUB_GRAPHQL", "true").lower() == "true"
+GHCR_URL = os.environ.get("GHCR_URL", "https://ghcr.io")
+GHCR_PAGE_SIZE = int(os.environ.get("GHCR_PAGE_SIZE", 1000))
+GHCR_TOKEN_TTL = float(os.environ.get("GHCR_TOKEN_TTL", 300))
+GHCR_TOKEN_RENEW_BEFORE = float(os.environ.get("GHCR_TOKEN_RENEW_BEFORE", 30))
+TAG_INDEX_SIZE = int(os.environ.get("TAG_INDEX_SIZE", 500))
+TAG_INDEX_PAGE_SIZE = int(os.environ.get("TAG_INDEX_PAGE_SIZE", 100))
+
+HTTP2 = os.environ.get("HTTP2", "true").lower() == "true"
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10)
+)
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_CACHE_SIZE = int(os.environ.get("HTTP_CACHE_SIZE", 512))
+
+# "memory" keeps everything per process, "sqlite" shares it between workers
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("CACHE_PATH", ".cache/slack-bot.sqlite3")
+CACHE_HTTP_TTL = float(os.environ.get("CACHE_HTTP_TTL", 86400))
+CACHE_LOCK_TTL = float(os.environ.get("CACHE_LOCK_TTL", 30))
+CACHE_LOCK_TIMEOUT = float(os.environ.get("CACHE_LOCK_TIMEOUT", 30))
+
+GITHUB_MAX_CONCURRENCY = int(os.environ.get("GITHUB_MAX_CONCURRENCY", 8))
+GITHUB_MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", 3))
+GITHUB_BACKOFF_BASE = float(os.environ.get("GITHUB_BACKOFF_BASE", 1))
+GITHUB_MAX_BACKOFF = float(os.environ.get("GITHUB_MAX_BACKOFF", 60))
+# GitHub asks for at least a minute before retrying after a secondary limit
+GITHUB_SECONDARY_BACKOFF = float(os.environ.get("GITHUB_SECONDARY_BACKOFF", 60))
+GITHUB_RATE_LIMIT_RESERVE = int(os.environ.get("GITHUB_RATE_LIMIT_RESERVE", 100))
+
+CLUSTER_MIRROR_PATH = os.environ.get("CLUSTER_MIRROR_PATH", "")
+CLUSTER_MIRROR_URL = os.environ.get(
+    "CLUSTER_MIRROR_URL",
+    f"https://github.com/{DEFAULT_REPOSITORY_OWNER}/{DEFAULT_CLUSTER_REPOSITORY}.git",
+)
+CLUSTER_MIRROR_INTERVAL = float(os.environ.get("CLUSTER_MIRROR_INTERVAL", 60))
+
+CLUSTER_HISTORY_INDEX = (
+    os.environ.get("CLUSTER_HISTORY_INDEX", "true").lower() == "true"
+)
+CLUSTER_HISTORY_MAX_COMMITS = int(os.environ.get("CLUSTER_HISTORY_MAX_COMMITS", 500))
+# Recent commits indexed when the index starts (at most one page, 100)
+CLUSTER_HISTORY_SEED_COMMITS = int(os.environ.get("CLUSTER_HISTORY_SEED_COMMITS", 100))
+
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", 300))
+SNAPSHOT_TTL = float(os.environ.get("SNAPSHOT_TTL", 60))
+SERVICE_DEADLINE = float(os.environ.get("SERVICE_DEADLINE", 8))
+PROGRESS_UPDATE_INTERVAL = float(os.environ.get("PROGRESS_UPDATE_INTERVAL", 1))
+# Slack caps section fields and checkbox options at 10 items
+PAGE_SIZE = min(int(os.environ.get("PAGE_SIZE", 6)), 10)
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 600))
+IDEMPOTENCY_SIZE = int(os.environ.get("IDEMPOTENCY_SIZE", 10000))
+DISPATCH_DEDUP_TTL = float(os.environ.get("DISPATCH_DEDUP_TTL", 60))
+
+# Event callbacks of other types/subtypes are acknowledged without reaching Bolt
+SLACK_EVENT_TYPES = set(os.environ.get("SLACK_EVENT_TYPES", "message").split(","))
+SLACK_IGNORED_SUBTYPES = set(
+    os.environ.get(
+        "SLACK_IGNORED_SUBTYPES",
+        "bot_message,message_changed,message_deleted,message_replied,"
+        "channel_join,channel_leave,channel_topic,channel_purpose",
+    ).split(",")
+)
+MESSAGE_LOG_SAMPLE_RATE = float(os.environ.get("MESSAGE_LOG_SAMPLE_RATE", 0.01))
+MESSAGE_LOG_MAX_CHARS = int(os.environ.get("MESSAGE_LOG_MAX_CHARS", 200))
+
+# Completed command traces, kept in memory for /trace and appended to
+# TRACE_PATH as JSON lines, the file rolling over to TRACE_PATH.1 past
+# TRACE_MAX_BYTES (so at most twice that on disk). An empty TRACE_PATH keeps
+# them in memory only.
+TRACE_PATH = os.environ.get("TRACE_PATH", ".cache/traces.jsonl")
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 10 << 20))
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 50))
+
+# Event loop lag is sampled every LOOP_LAG_INTERVAL; a stall longer than
+# LOOP_BLOCK_THRESHOLD logs the blocking stack. LOOP_MONITOR_STRICT (tests/CI)
+# makes a command fail if the loop was blocked while it ran.
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.1))
+LOOP_LAG_WINDOW = int(os.environ.get("LOOP_LAG_WINDOW", 600))
+LOOP_BLOCK_THRESHOLD = float(os.environ.get("LOOP_BLOCK_THRESHOLD", 0.25))
+LOOP_MONITOR_STRICT = os.environ.get("LOOP_MONITOR_STRICT", "false").lower() == "true"
+
 _imported_variable = {
     "PORT": PORT,
     "BOT_TOKEN": BOT_TOKEN,
@@ -1,5 +1,11 @@
 import uvicorn
 
-from app import ENV, HOST, PORT
+from app import ENV, HOST, PORT, WORKERS
 
-uvicorn.run("app.main:api", host=HOST, port=PORT, reload=ENV == "development")
+uvicorn.run(
+    "app.main:api",
+    host=HOST,
+    port=PORT,
+    reload=ENV == "development",
+    workers=WORKERS,
+)
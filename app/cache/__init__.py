@@ -0,0 +1,4 @@
+from .backend import *
+from .memory import *
+from .shared import *
+from .sqlite import *
@@ -0,0 +1,62 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app import CACHE_LOCK_TIMEOUT, CACHE_LOCK_TTL
+
+LOCK_POLL_INTERVAL = 0.05
+LOCK_MAX_POLL_INTERVAL = 1.0
+
+
+# Key/value store for state that can be shared between workers. Values are
+# bytes, expiry is optional. Locks are leases: a holder that dies without
+# unlocking loses the lock after its TTL.
+class CacheBackend:
+    # Whether other processes see what this backend stores
+    shared = False
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def try_lock(self, key: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def unlock(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    # Waits up to timeout for the lock. Yields whether it was acquired, so a
+    # caller can still go ahead (unserialized) rather than fail.
+    @asynccontextmanager
+    async def lock(
+        self,
+        key: str,
+        ttl: float = CACHE_LOCK_TTL,
+        timeout: float = CACHE_LOCK_TIMEOUT,
+    ) -> AsyncIterator[bool]:
+        deadline = time.monotonic() + timeout
+        interval = LOCK_POLL_INTERVAL
+        acquired = await self.try_lock(key, ttl)
+        while not acquired and time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, LOCK_MAX_POLL_INTERVAL)
+            acquired = await self.try_lock(key, ttl)
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await self.unlock(key)
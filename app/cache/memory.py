@@ -0,0 +1,37 @@
+import time
+from typing import Dict, Tuple
+
+from app.cache.backend import CacheBackend
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self):
+        super().__init__()
+        self._entries: Dict[str, Tuple[bytes, float | None]] = {}
+        self._locks: Dict[str, float] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def try_lock(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        if self._locks.get(key, 0) > now:
+            return False
+        self._locks[key] = now + ttl
+        return True
+
+    async def unlock(self, key: str) -> None:
+        self._locks.pop(key, None)
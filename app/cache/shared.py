@@ -0,0 +1,15 @@
+from app import CACHE_BACKEND, CACHE_PATH
+from app.cache.backend import CacheBackend
+from app.cache.memory import MemoryBackend
+from app.cache.sqlite import SQLiteBackend
+
+
+def create_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(CACHE_PATH)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+shared_cache = create_backend()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.cache.backend import CacheBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+# A local SQLite file in WAL mode: every worker on the host reads and writes
+# the same entries, readers don't block the writer, and the data survives
+# restarts. Queries run on a dedicated thread so the event loop never waits
+# on disk or on another worker's write lock.
+class SQLiteBackend(CacheBackend):
+    shared = True
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            connection.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            self._connection = connection
+            logging.info(f"Opened shared cache at {self.path}")
+        return self._connection
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._connect()))
+
+    async def get(self, key: str) -> bytes | None:
+        def get(connection: sqlite3.Connection) -> bytes | None:
+            row = connection.execute(
+                "SELECT value FROM entries WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            return row[0] if row else None
+
+        return await self._run(get)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        await self._run(
+            lambda connection: connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._run(
+            lambda connection: connection.execute(
+                "DELETE FROM entries WHERE key = ?", (key,)
+            )
+        )
+
+    async def try_lock(self, key: str, ttl: float) -> bool:
+        def try_lock(connection: sqlite3.Connection) -> bool:
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now)
+                )
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO locks (key, owner, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, self.owner, now + ttl),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+        return await self._run(try_lock)
+
+    async def unlock(self, key: str) -> None:
+        await self._run(
+            lambda connection: connection.execute(
+                "DELETE FROM locks WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+        )
+
+    async def close(self) -> None:
+        def close(connection: sqlite3.Connection) -> None:
+            connection.close()
+
+        if self._connection is not None:
+            await self._run(close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
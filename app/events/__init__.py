@@ -3,3 +3,4 @@ from .get import *
 from .info import *
 from .message import *
 from .prod import *
+from .trace import *
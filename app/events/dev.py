@@ -1,48 +1,49 @@
 import asyncio
 import logging
-from typing import List
+import re
+from typing import Dict, List
 
+from app import DISPATCH_DEDUP_TTL
 from app.deployments import deployments
-from app.git import (
-    dispatch_workflow,
-    get_latest_commit,
-    get_latest_deployments,
-    get_latest_image,
+from app.events.progressive import (
+    get_as_of_element,
+    get_page,
+    get_page_element,
+    get_pagination_elements,
+    get_status_block,
+    render_progressively,
 )
+from app.git import dispatch_workflow
 from app.main import app
-from app.models import Deployment
-from app.utils import format_date
-
-
-async def get_deployments_data() -> List[Deployment]:
-    deployments_data = deployments.copy()
-
-    [latest_images, latest_commits, latest_versions] = await asyncio.gather(
-        asyncio.gather(
-            *[get_latest_image(deployment.package) for deployment in deployments_data]
-        ),
-        asyncio.gather(
-            *[
-                get_latest_commit(deployment.repository)
-                for deployment in deployments_data
-            ]
-        ),
-        asyncio.gather(
-            *[
-                get_latest_deployments(deployment.deployments, drop_production=True)
-                for deployment in deployments_data
-            ]
-        ),
-    )
+from app.models import (
+    Deployment,
+    DeploymentField,
+    DeploymentSnapshot,
+    DispatchStatus,
+)
+from app.utils import (
+    command_errors,
+    format_date,
+    idempotency,
+    timed_command,
+    trace_command,
+)
+
+DEV_FIELDS = frozenset(
+    {
+        DeploymentField.LATEST_IMAGE,
+        DeploymentField.LATEST_COMMIT,
+        DeploymentField.DEVELOPMENT_VERSION,
+    }
+)
 
-    for deployment, latest_image, latest_commit, deployment_version in zip(
-        deployments_data, latest_images, latest_commits, latest_versions
-    ):
-        deployment.latest_image = latest_image
-        deployment.latest_commit = latest_commit
-        deployment.latest_version = deployment_version
 
-    return deployments_data
+def get_dispatch_text(status: DispatchStatus) -> str:
+    if status == DispatchStatus.DISPATCHED:
+        return " ✅"
+    if status == DispatchStatus.DUPLICATE:
+        return f" ⏳ already dispatched within the last {DISPATCH_DEDUP_TTL:g}s"
+    return " ❌"
 
 
 def sort_deployments(deployments_data: List[Deployment]) -> List[List[Deployment]]:
@@ -88,19 +89,13 @@ def get_deployment_checkbox(deployment: Deployment):
     }
 
 
-@app.command("/dev")
-async def dev_deploy(ack, respond, command):
-    await ack()
-    logging.info(f"Acknowledged /dev command")
-
-    try:
-        deployments_data = await get_deployments_data()
-        [recommended_deployments, already_updated_deployments] = sort_deployments(
-            deployments_data
-        )
-    except Exception as e:
-        logging.error(f"Error fetching deployments data: {e}")
-        return await respond(f"❌ Error: {e}")
+def get_dev_blocks(
+    snapshot: DeploymentSnapshot, status: Dict[str, str], page: int
+) -> List[dict]:
+    deployments, page, pages = get_page(snapshot.deployments, page)
+    [recommended_deployments, already_updated_deployments] = sort_deployments(
+        [deployment for deployment in deployments if deployment.id not in status]
+    )
 
     message_blocks = [
         {
@@ -148,6 +143,10 @@ async def dev_deploy(ack, respond, command):
         )
         message_blocks.append({"type": "divider"})
 
+    if status:
+        message_blocks.append(get_status_block(deployments, status))
+        message_blocks.append({"type": "divider"})
+
     message_blocks.extend(
         [
             {
@@ -156,7 +155,9 @@ async def dev_deploy(ack, respond, command):
                     {
                         "type": "mrkdwn",
                         "text": "🔔 *Note:* Select services to deploy to *Development*. Ensure all selections are reviewed before proceeding.",
-                    }
+                    },
+                    get_as_of_element(snapshot, deployments),
+                    get_page_element(page, pages),
                 ],
             },
             {
@@ -181,12 +182,46 @@ async def dev_deploy(ack, respond, command):
                         },
                         "action_id": "deploy-dev-cancel",
                     },
+                    *get_pagination_elements("deploy-dev", page, pages),
                 ],
             },
         ]
     )
 
-    await respond(blocks=message_blocks)
+    return message_blocks
+
+
+@app.command("/dev")
+@timed_command("/dev")
+@trace_command("/dev")
+async def dev_deploy(ack, respond, command):
+    await ack()
+    logging.info(f"Acknowledged /dev command")
+
+    try:
+        await render_progressively(respond, get_dev_blocks, DEV_FIELDS)
+    except Exception as e:
+        command_errors.inc(command="/dev")
+        logging.error(f"Error fetching deployments data: {e}")
+        return await respond(f"❌ Error: {e}")
+
+
+@app.action(re.compile(r"^deploy-dev-page-(prev|next)$"))
+@trace_command("/dev page")
+async def deploy_dev_page_action(ack, respond, action):
+    await ack()
+
+    try:
+        await render_progressively(
+            respond,
+            get_dev_blocks,
+            DEV_FIELDS,
+            int(action["value"]),
+            replace_original=True,
+        )
+    except Exception as e:
+        logging.error(f"Error fetching deployments data: {e}")
+        return await respond(f"❌ Error: {e}")
 
 
 @app.action("deploy-dev")
@@ -195,6 +230,7 @@ async def deploy_dev_action(body, ack, say):
 
 
 @app.action("deploy-dev-button")
+@trace_command("/dev deploy")
 async def deploy_dev_button_action(body, ack, respond):
     await ack()
 
@@ -208,6 +244,12 @@ async def deploy_dev_button_action(body, ack, respond):
     if not selected_deployments:
         return await respond("❌ No services selected for deployment.")
 
+    # A double-click sends the same selection from the same message twice
+    container = body.get("container", {})
+    key = f"{container.get('channel_id')}:{container.get('message_ts')}:{sorted(selected_services)}"
+    if not idempotency.claim("deploy-dev", key, ttl=DISPATCH_DEDUP_TTL):
+        return await respond("⏳ This deployment was already requested.")
+
     logging.info(
         f"Deploy to Development: {[deployment.title for deployment in selected_deployments]}"
     )
@@ -216,8 +258,16 @@ async def deploy_dev_button_action(body, ack, respond):
         *[
             dispatch_workflow(deployment.repository, deployment.workflows.development)
             for deployment in selected_deployments
-        ]
+        ],
+        return_exceptions=True,
     )
+    for i, (deployment, result) in enumerate(zip(selected_deployments, results)):
+        if isinstance(result, BaseException):
+            logging.error(f"Error dispatching {deployment.title}: {result}")
+            results[i] = DispatchStatus.FAILED
+    # Nothing was dispatched, so a retry mustn't be taken for a double-click
+    if all(result == DispatchStatus.FAILED for result in results):
+        idempotency.release("deploy-dev", key)
 
     message_blocks = [
         {
@@ -249,7 +299,7 @@ async def deploy_dev_button_action(body, ack, respond):
                                     },
                                     {
                                         "type": "text",
-                                        "text": " ✅" if result else " ❌",
+                                        "text": get_dispatch_text(result),
                                     },
                                 ],
                             }
@@ -1,10 +1,22 @@
+import asyncio
 import datetime
 import logging
 import os
 from enum import StrEnum
 
+import httpx
+
+from app import HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT, UPLOAD_CHUNK_SIZE
 from app.main import app
-from app.utils import get_payments, get_recruiters, get_students
+from app.utils import (
+    ExportFormat,
+    command_errors,
+    get_payments,
+    get_recruiters,
+    get_students,
+    timed_command,
+    trace_command,
+)
 
 
 class SupportedTables(StrEnum):
@@ -13,12 +25,48 @@ class SupportedTables(StrEnum):
     payments = "payments"
 
 
+async def read_chunks(file_path: str):
+    with open(file_path, "rb") as file:
+        while chunk := await asyncio.to_thread(file.read, UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+
+# files_upload_v2 reads the whole file on the event loop. This goes through the
+# same external upload API, streaming the file in UPLOAD_CHUNK_SIZE pieces
+# read off the loop.
+async def upload_file(
+    channel: str, file_name: str, file_path: str, initial_comment: str
+) -> None:
+    length = await asyncio.to_thread(os.path.getsize, file_path)
+    upload = await app.client.files_getUploadURLExternal(
+        filename=file_name, length=length
+    )
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    ) as client:
+        response = await client.post(
+            upload["upload_url"],
+            content=read_chunks(file_path),
+            headers={"Content-Length": str(length)},
+        )
+        response.raise_for_status()
+    await app.client.files_completeUploadExternal(
+        files=[{"id": upload["file_id"], "title": file_name}],
+        channel_id=channel,
+        initial_comment=initial_comment,
+    )
+
+
 @app.command("/get")
+@timed_command("/get")
+@trace_command("/get")
 async def get(ack, respond, command):
     await ack()
 
     try:
-        raw_table = command.get("text", "").strip()
+        arguments = command.get("text", "").split()
+        raw_table = arguments[0] if arguments else ""
+        raw_format = arguments[1] if len(arguments) > 1 else ExportFormat.xlsx
         if not raw_table:
             return await respond(
                 blocks=[
@@ -26,7 +74,7 @@ async def get(ack, respond, command):
                         "type": "section",
                         "text": {
                             "type": "mrkdwn",
-                            "text": f"Please provide a table name.\nSupported tables: {', '.join([f'`{table.value}`' for table in SupportedTables])}.\n\nExample: `/get students`\n\nYou can also use substring of the table name. For example, `/get stu`.",
+                            "text": f"Please provide a table name.\nSupported tables: {', '.join([f'`{table.value}`' for table in SupportedTables])}.\n\nExample: `/get students`\n\nYou can also use substring of the table name. For example, `/get stu`.\n\nAdd a format to get a CSV instead of a spreadsheet: `/get payments csv` or `/get payments csv.gz`.",
                         },
                     }
                 ]
@@ -46,26 +94,43 @@ async def get(ack, respond, command):
                 ]
             )
 
-        await respond(f"Getting data from `{table}` table...")
-        logging.info(f"Getting data from `{table}` table...")
+        export_format = next(
+            (f for f in ExportFormat if f.value == raw_format.lower()), None
+        )
+        if not export_format:
+            return await respond(
+                blocks=[
+                    {
+                        "type": "section",
+                        "text": {
+                            "type": "mrkdwn",
+                            "text": f"Format `{raw_format}` is not supported.\nSupported formats: {', '.join([f'`{f.value}`' for f in ExportFormat])}.",
+                        },
+                    }
+                ]
+            )
+
+        await respond(f"Getting data from `{table}` table as `{export_format}`...")
+        logging.info(f"Getting data from `{table}` table as `{export_format}`...")
 
         if table == SupportedTables.students:
-            (file_name, file_path) = await get_students()
+            file_name, file_path = await get_students(export_format)
         elif table == SupportedTables.recruiters:
-            (file_name, file_path) = await get_recruiters()
+            file_name, file_path = await get_recruiters(export_format)
         elif table == SupportedTables.payments:
-            (file_name, file_path) = await get_payments()
+            file_name, file_path = await get_payments(export_format)
 
         # Upload file to Slack
-        await app.client.files_upload_v2(
+        await upload_file(
             channel=command["channel_id"],
-            filename=file_name,
-            file=file_path,
+            file_name=file_name,
+            file_path=file_path,
             initial_comment=f"Here is the data from `{table}` table ({datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}).",
         )
         logging.info(f"Data from `{table}` table uploaded.")
         os.remove(file_path)
 
     except Exception as e:
+        command_errors.inc(command="/get")
         logging.error(f"Error: {e}")
         return await respond(f"❌ Error: {e}")
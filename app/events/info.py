@@ -1,52 +1,35 @@
-import asyncio
-from typing import List
+import re
+from typing import Dict, List
 
-from app.deployments import deployments
-from app.git import get_latest_commit, get_latest_deployments, get_latest_image
+from app.events.progressive import (
+    get_as_of_element,
+    get_page,
+    get_page_element,
+    get_pagination_elements,
+    get_status_text,
+    render_progressively,
+)
 from app.main import app
-from app.models import Deployment
-from app.utils import format_date
+from app.models import ALL_FIELDS, Deployment, DeploymentSnapshot
+from app.utils import command_errors, format_date, timed_command, trace_command
 
 
-async def get_deployments_data() -> List[Deployment]:
-    deployments_data = deployments.copy()
-
-    [latest_images, latest_commits, latest_versions] = await asyncio.gather(
-        asyncio.gather(
-            *[get_latest_image(deployment.package) for deployment in deployments_data]
-        ),
-        asyncio.gather(
-            *[
-                get_latest_commit(deployment.repository)
-                for deployment in deployments_data
-            ]
-        ),
-        asyncio.gather(
-            *[
-                get_latest_deployments(deployment.deployments)
-                for deployment in deployments_data
-            ]
-        ),
-    )
-
-    for deployment, latest_image, latest_commit, deployment_version in zip(
-        deployments_data, latest_images, latest_commits, latest_versions
-    ):
-        deployment.latest_image = latest_image
-        deployment.latest_commit = latest_commit
-        deployment.latest_version = deployment_version
+def get_deployment_field(deployment: Deployment, status: str | None) -> dict:
+    if status:
+        return {
+            "type": "mrkdwn",
+            "text": f"> {deployment.emoji} *{deployment.title}*\n> \n> {get_status_text(status)}\n\n-\n",
+        }
+    return {
+        "type": "mrkdwn",
+        "text": f"> {deployment.emoji} *{deployment.title}*\n> \n> *Development Version:* \n> `{deployment.latest_version.development_version}` at _{format_date(deployment.latest_version.development_date)}_\n> \n> *Production Version:* \n> `{deployment.latest_version.production_version}` at _{format_date(deployment.latest_version.production_date)}_\n> \n> *Latest Image:* \n> `{deployment.latest_image.version}` (`{deployment.latest_image.sha()}`)\n> \n> *Latest Commit:* \n> `{deployment.latest_commit.sha()}` at _{format_date(deployment.latest_commit.date)}_\n\n-\n",
+    }
 
-    return deployments_data
 
-
-@app.command("/info")
-async def info(ack, respond, command):
-    await ack()
-
-    try:
-        deployments_data = await get_deployments_data()
-    except Exception as e:
-        return await respond(f"❌ Error: {e}")
+def get_info_blocks(
+    snapshot: DeploymentSnapshot, status: Dict[str, str], page: int
+) -> List[dict]:
+    deployments, page, pages = get_page(snapshot.deployments, page)
 
     message_blocks = [
         {
@@ -64,14 +47,54 @@ async def info(ack, respond, command):
         {
             "type": "section",
             "fields": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"> {deployment.emoji} *{deployment.title}*\n> \n> *Development Version:* \n> `{deployment.latest_version.development_version}` at _{format_date(deployment.latest_version.development_date)}_\n> \n> *Production Version:* \n> `{deployment.latest_version.production_version}` at _{format_date(deployment.latest_version.production_date)}_\n> \n> *Latest Image:* \n> `{deployment.latest_image.version}` (`{deployment.latest_image.sha()}`)\n> \n> *Latest Commit:* \n> `{deployment.latest_commit.sha()}` at _{format_date(deployment.latest_commit.date)}_\n\n-\n",
-                }
-                for deployment in deployments_data
+                get_deployment_field(deployment, status.get(deployment.id))
+                for deployment in deployments
             ],
         }
     )
     message_blocks.append({"type": "divider"})
+    message_blocks.append(
+        {
+            "type": "context",
+            "elements": [
+                get_as_of_element(snapshot, deployments),
+                get_page_element(page, pages),
+            ],
+        }
+    )
 
-    await respond(blocks=message_blocks)
+    pagination_elements = get_pagination_elements("info", page, pages)
+    if pagination_elements:
+        message_blocks.append({"type": "actions", "elements": pagination_elements})
+
+    return message_blocks
+
+
+@app.command("/info")
+@timed_command("/info")
+@trace_command("/info")
+async def info(ack, respond, command):
+    await ack()
+
+    try:
+        await render_progressively(respond, get_info_blocks, ALL_FIELDS)
+    except Exception as e:
+        command_errors.inc(command="/info")
+        return await respond(f"❌ Error: {e}")
+
+
+@app.action(re.compile(r"^info-page-(prev|next)$"))
+@trace_command("/info page")
+async def info_page_action(ack, respond, action):
+    await ack()
+
+    try:
+        await render_progressively(
+            respond,
+            get_info_blocks,
+            ALL_FIELDS,
+            int(action["value"]),
+            replace_original=True,
+        )
+    except Exception as e:
+        return await respond(f"❌ Error: {e}")
@@ -1,6 +1,26 @@
+import json
+import random
+
+from app import MESSAGE_LOG_MAX_CHARS, MESSAGE_LOG_SAMPLE_RATE
 from app.main import app
 
 
+def get_message_summary(body: dict) -> dict:
+    event = body.get("event") or {}
+    text = event.get("text") or ""
+    return {
+        "event_id": body.get("event_id"),
+        "channel": event.get("channel"),
+        "user": event.get("user"),
+        "ts": event.get("ts"),
+        "subtype": event.get("subtype"),
+        "length": len(text),
+        "text": text[:MESSAGE_LOG_MAX_CHARS],
+    }
+
+
 @app.event("message")
 async def handle_message_events(body, logger):
-    logger.info(body)
+    # Sampled and size-capped, every channel message ends up here
+    if random.random() < MESSAGE_LOG_SAMPLE_RATE:
+        logger.info(json.dumps(get_message_summary(body), ensure_ascii=False))
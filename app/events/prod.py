@@ -1,28 +1,36 @@
 import asyncio
 import logging
-from typing import List
+import re
+from typing import Dict, List
 
+from app import DISPATCH_DEDUP_TTL
 from app.deployments import deployments
-from app.git import dispatch_workflow, get_latest_deployments
+from app.events.progressive import (
+    get_as_of_element,
+    get_page,
+    get_page_element,
+    get_pagination_elements,
+    get_status_block,
+    render_progressively,
+)
+from app.git import dispatch_workflow
 from app.main import app
-from app.models import Deployment
-from app.utils import format_date
+from app.models import VERSION_FIELDS, Deployment, DeploymentSnapshot, DispatchStatus
+from app.utils import (
+    command_errors,
+    format_date,
+    idempotency,
+    timed_command,
+    trace_command,
+)
 
 
-async def get_deployments_data() -> List[Deployment]:
-    deployments_data = deployments.copy()
-
-    latest_versions = await asyncio.gather(
-        *[
-            get_latest_deployments(deployment.deployments)
-            for deployment in deployments_data
-        ]
-    )
-
-    for deployment, deployment_versions in zip(deployments_data, latest_versions):
-        deployment.latest_version = deployment_versions
-
-    return deployments_data
+def get_dispatch_text(status: DispatchStatus) -> str:
+    if status == DispatchStatus.DISPATCHED:
+        return " ✅"
+    if status == DispatchStatus.DUPLICATE:
+        return f" ⏳ already dispatched within the last {DISPATCH_DEDUP_TTL:g}s"
+    return " ❌"
 
 
 def sort_deployments(deployments_data: List[Deployment]) -> List[List[Deployment]]:
@@ -58,19 +66,13 @@ def get_deployment_checkbox(deployment: Deployment):
     }
 
 
-@app.command("/prod")
-async def prod_deploy(ack, respond, command):
-    await ack()
-    logging.info("Acknowledged /prod command")
-
-    try:
-        deployments_data = await get_deployments_data()
-        [recommended_deployments, already_updated_deployments] = sort_deployments(
-            deployments_data
-        )
-    except Exception as e:
-        logging.error(f"Error fetching deployments data: {e}")
-        return await respond(f"Error: {e}")
+def get_prod_blocks(
+    snapshot: DeploymentSnapshot, status: Dict[str, str], page: int
+) -> List[dict]:
+    deployments, page, pages = get_page(snapshot.deployments, page)
+    [recommended_deployments, already_updated_deployments] = sort_deployments(
+        [deployment for deployment in deployments if deployment.id not in status]
+    )
 
     message_blocks = [
         {
@@ -118,6 +120,10 @@ async def prod_deploy(ack, respond, command):
         )
         message_blocks.append({"type": "divider"})
 
+    if status:
+        message_blocks.append(get_status_block(deployments, status))
+        message_blocks.append({"type": "divider"})
+
     message_blocks.extend(
         [
             {
@@ -126,7 +132,9 @@ async def prod_deploy(ack, respond, command):
                     {
                         "type": "mrkdwn",
                         "text": "🔔 *Note:* Select services to deploy to *Production*. Ensure all selections are reviewed before proceeding.",
-                    }
+                    },
+                    get_as_of_element(snapshot, deployments),
+                    get_page_element(page, pages),
                 ],
             },
             {
@@ -151,12 +159,46 @@ async def prod_deploy(ack, respond, command):
                         },
                         "action_id": "deploy-prod-cancel",
                     },
+                    *get_pagination_elements("deploy-prod", page, pages),
                 ],
             },
         ]
     )
 
-    await respond(blocks=message_blocks)
+    return message_blocks
+
+
+@app.command("/prod")
+@timed_command("/prod")
+@trace_command("/prod")
+async def prod_deploy(ack, respond, command):
+    await ack()
+    logging.info("Acknowledged /prod command")
+
+    try:
+        await render_progressively(respond, get_prod_blocks, VERSION_FIELDS)
+    except Exception as e:
+        command_errors.inc(command="/prod")
+        logging.error(f"Error fetching deployments data: {e}")
+        return await respond(f"Error: {e}")
+
+
+@app.action(re.compile(r"^deploy-prod-page-(prev|next)$"))
+@trace_command("/prod page")
+async def deploy_prod_page_action(ack, respond, action):
+    await ack()
+
+    try:
+        await render_progressively(
+            respond,
+            get_prod_blocks,
+            VERSION_FIELDS,
+            int(action["value"]),
+            replace_original=True,
+        )
+    except Exception as e:
+        logging.error(f"Error fetching deployments data: {e}")
+        return await respond(f"❌ Error: {e}")
 
 
 @app.action("deploy-prod")
@@ -165,6 +207,7 @@ async def deploy_prod_action(body, ack, say):
 
 
 @app.action("deploy-prod-button")
+@trace_command("/prod deploy")
 async def deploy_prod_button_action(body, ack, respond):
     await ack()
 
@@ -178,6 +221,12 @@ async def deploy_prod_button_action(body, ack, respond):
     if not selected_deployments:
         return await respond("❌ No services selected for deployment.")
 
+    # A double-click sends the same selection from the same message twice
+    container = body.get("container", {})
+    key = f"{container.get('channel_id')}:{container.get('message_ts')}:{sorted(selected_services)}"
+    if not idempotency.claim("deploy-prod", key, ttl=DISPATCH_DEDUP_TTL):
+        return await respond("⏳ This deployment was already requested.")
+
     logging.info(
         f"Deploy to Production: {[deployment.title for deployment in selected_deployments]}"
     )
@@ -186,8 +235,16 @@ async def deploy_prod_button_action(body, ack, respond):
         *[
             dispatch_workflow(deployment.repository, deployment.workflows.production)
             for deployment in selected_deployments
-        ]
+        ],
+        return_exceptions=True,
     )
+    for i, (deployment, result) in enumerate(zip(selected_deployments, results)):
+        if isinstance(result, BaseException):
+            logging.error(f"Error dispatching {deployment.title}: {result}")
+            results[i] = DispatchStatus.FAILED
+    # Nothing was dispatched, so a retry mustn't be taken for a double-click
+    if all(result == DispatchStatus.FAILED for result in results):
+        idempotency.release("deploy-prod", key)
 
     message_blocks = [
         {
@@ -219,7 +276,7 @@ async def deploy_prod_button_action(body, ack, respond):
                                     },
                                     {
                                         "type": "text",
-                                        "text": " ✅" if result else " ❌",
+                                        "text": get_dispatch_text(result),
                                     },
                                 ],
                             }
@@ -0,0 +1,170 @@
+import logging
+import time
+from typing import Callable, Dict, FrozenSet, List, Tuple, TypeVar
+
+from app import PAGE_SIZE, PROGRESS_UPDATE_INTERVAL, SERVICE_DEADLINE
+from app.models import Deployment, DeploymentField, DeploymentSnapshot
+from app.state import deployment_store
+from app.utils import format_date
+
+PENDING = "pending"
+# Past SERVICE_DEADLINE, left to finish in the background for the next command
+LATE = "late"
+UNAVAILABLE = "unavailable"
+
+# A slash command's response_url accepts at most 5 messages
+MAX_RESPONSES = 5
+
+T = TypeVar("T")
+
+
+# Replaces the command's response in place, throttled so the final render
+# always has a response_url use left.
+class ProgressiveMessage:
+    def __init__(self, respond, replace_original: bool = False):
+        self.respond = respond
+        self.replace_original = replace_original
+        self.responses = 0
+        self._last_sent = 0.0
+        self._pending_blocks: List[dict] | None = None
+
+    async def _send(self, blocks: List[dict]) -> None:
+        await self.respond(
+            blocks=blocks, replace_original=self.replace_original or self.responses > 0
+        )
+        self.responses += 1
+        self._last_sent = time.monotonic()
+        self._pending_blocks = None
+
+    async def update(self, blocks: List[dict]) -> None:
+        if self.responses == 0 or (
+            self.responses < MAX_RESPONSES - 1
+            and time.monotonic() - self._last_sent >= PROGRESS_UPDATE_INTERVAL
+        ):
+            await self._send(blocks)
+        else:
+            self._pending_blocks = blocks
+
+    async def flush(self) -> None:
+        if self._pending_blocks is not None:
+            await self._send(self._pending_blocks)
+
+
+BlocksBuilder = Callable[[DeploymentSnapshot, Dict[str, str], int], List[dict]]
+
+
+def get_page(items: List[T], page: int) -> Tuple[List[T], int, int]:
+    pages = max(1, -(-len(items) // PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    return items[page * PAGE_SIZE : (page + 1) * PAGE_SIZE], page, pages
+
+
+# Render one page from the store if its services have every field the view
+# shows, otherwise post a skeleton right away and fill it in as each service's
+# data arrives. Services without data at SERVICE_DEADLINE (counted from the
+# command, the page's fetches all start with it) are shown as still loading
+# and finish in the background. Only the visible page is fetched; the next one
+# is prefetched in the background so paging forward is instant.
+async def render_progressively(
+    respond,
+    get_blocks: BlocksBuilder,
+    fields: FrozenSet[DeploymentField],
+    page: int = 0,
+    replace_original: bool = False,
+) -> None:
+    targets, page, pages = get_page(deployment_store.registry, page)
+    if page + 1 < pages:
+        deployment_store.prefetch(
+            get_page(deployment_store.registry, page + 1)[0], fields
+        )
+
+    if all(
+        deployment_store.is_complete(deployment.id, fields) for deployment in targets
+    ):
+        snapshot = deployment_store.view(targets, fields)
+        return await respond(
+            blocks=get_blocks(snapshot, {}, page), replace_original=replace_original
+        )
+
+    status = {
+        deployment.id: PENDING
+        for deployment in targets
+        if not deployment_store.is_complete(deployment.id, fields)
+    }
+    message = ProgressiveMessage(respond, replace_original)
+    await message.update(get_blocks(deployment_store.snapshot(), status, page))
+
+    async for deployment_id, error in deployment_store.fill(
+        SERVICE_DEADLINE, targets, fields
+    ):
+        if error is None:
+            status.pop(deployment_id)
+        elif isinstance(error, TimeoutError):
+            status[deployment_id] = LATE
+        else:
+            logging.error(f"Error fetching `{deployment_id}`: {error}")
+            status[deployment_id] = UNAVAILABLE
+        await message.update(get_blocks(deployment_store.snapshot(), status, page))
+
+    await message.flush()
+
+
+def get_status_text(status: str) -> str:
+    if status == PENDING:
+        return "⏳ _Loading..._"
+    if status == LATE:
+        return "⏳ _Still loading, try again in a moment_"
+    return "⚠️ _Unavailable_"
+
+
+def get_status_block(deployments: List[Deployment], status: Dict[str, str]) -> dict:
+    return {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*⏳ Waiting for Data*\n---\n"
+            + "\n".join(
+                f"{deployment.emoji} *{deployment.title}* {get_status_text(status[deployment.id])}"
+                for deployment in deployments
+                if deployment.id in status
+            ),
+        },
+    }
+
+
+def get_as_of_element(
+    snapshot: DeploymentSnapshot, deployments: List[Deployment]
+) -> dict:
+    as_of = snapshot.as_of([deployment.id for deployment in deployments])
+    return {
+        "type": "mrkdwn",
+        "text": f"🕒 *Data as of:* _{format_date(as_of) if as_of else 'loading'}_",
+    }
+
+
+def get_page_element(page: int, pages: int) -> dict:
+    return {"type": "mrkdwn", "text": f"📄 *Page:* {page + 1} of {pages}"}
+
+
+# Previous/next buttons carry the target page, handled by "<prefix>-page-*"
+def get_pagination_elements(prefix: str, page: int, pages: int) -> List[dict]:
+    elements = []
+    if page > 0:
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "◀️ Previous", "emoji": True},
+                "value": str(page - 1),
+                "action_id": f"{prefix}-page-prev",
+            }
+        )
+    if page + 1 < pages:
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Next ▶️", "emoji": True},
+                "value": str(page + 1),
+                "action_id": f"{prefix}-page-next",
+            }
+        )
+    return elements
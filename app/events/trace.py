@@ -0,0 +1,40 @@
+import datetime
+
+from app.main import app
+from app.utils import last_trace, render_waterfall, traces
+
+
+def get_trace_text(text: str) -> str:
+    argument = text.strip() or "last"
+    if argument == "last":
+        trace = last_trace()
+    else:
+        trace = next((t for t in traces if t.trace_id == argument), None)
+
+    if trace is None:
+        if argument == "last":
+            return "No command has been traced yet."
+        return f"Trace `{argument}` is not in the last {len(traces)} traces.\n\nUsage: `/trace last` or `/trace <trace id>`."
+
+    started_at = datetime.datetime.fromtimestamp(trace.started_at).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    duration = (
+        "still running"
+        if trace.root.duration is None
+        else f"{trace.root.duration * 1000:.0f}ms"
+    )
+    blocked = trace.root.attributes.get("loop_blocked_ms")
+    if blocked:
+        duration += f", event loop blocked for {blocked}ms"
+    return f"*{trace.root.name}* took {duration} (trace `{trace.trace_id}`, {started_at})\n```\n{render_waterfall(trace)}\n```"
+
+
+@app.command("/trace")
+async def trace(ack, respond, command):
+    await ack()
+
+    try:
+        await respond(get_trace_text(command.get("text", "")))
+    except Exception as e:
+        return await respond(f"❌ Error: {e}")
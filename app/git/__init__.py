@@ -1,4 +1,12 @@
+from .cache import *
+from .client import *
 from .cluster import *
 from .commits import *
+from .ghcr_auth import *
+from .graphql import *
+from .history import *
+from .mirror import *
 from .packages import *
+from .scheduler import *
+from .tags import *
 from .workflows import *
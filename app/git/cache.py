@@ -0,0 +1,165 @@
+import base64
+import json
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+import httpx
+
+from app import CACHE_HTTP_TTL, HTTP_CACHE_SIZE
+from app.cache import shared_cache
+from app.git.scheduler import token_id
+
+# Only these headers are replayed from a cached response, the body is stored
+# already decoded so content-encoding/length must not be carried over.
+_REPLAYED_HEADERS = ("content-type", "etag", "last-modified")
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    content: bytes
+    headers: dict[str, str]
+    etag: str | None
+    last_modified: str | None
+
+    def dumps(self) -> bytes:
+        data = asdict(self)
+        data["content"] = base64.b64encode(self.content).decode("ascii")
+        return json.dumps(data).encode("utf-8")
+
+    @classmethod
+    def loads(cls, value: bytes) -> "CacheEntry":
+        data = json.loads(value)
+        data["content"] = base64.b64decode(data["content"])
+        return cls(**data)
+
+
+class HttpCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: tuple, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_hits": self.shared_hits,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+http_cache = HttpCache(HTTP_CACHE_SIZE)
+
+
+# Responses differ per upstream host and per token (private repositories, a
+# rotated token), so both are part of the key
+def _cache_key(
+    client: httpx.AsyncClient, url: str, headers: dict, params: dict | None
+) -> tuple:
+    request = client.build_request("GET", url, headers=headers)
+    return (
+        request.url.host,
+        token_id(request),
+        url,
+        request.headers.get("Accept"),
+        tuple(sorted((params or {}).items())),
+    )
+
+
+def _shared_key(key: tuple) -> str:
+    return "http:" + json.dumps(key)
+
+
+# Entries revalidated by another worker are picked up from the shared cache, so
+# each worker doesn't need its own full download first.
+async def _get_entry(key: tuple) -> CacheEntry | None:
+    entry = http_cache.get(key)
+    if entry is None and shared_cache.shared:
+        value = await shared_cache.get(_shared_key(key))
+        if value is not None:
+            entry = CacheEntry.loads(value)
+            http_cache.set(key, entry)
+            http_cache.shared_hits += 1
+    return entry
+
+
+async def _set_entry(key: tuple, entry: CacheEntry) -> None:
+    http_cache.set(key, entry)
+    if shared_cache.shared:
+        await shared_cache.set(_shared_key(key), entry.dumps(), ttl=CACHE_HTTP_TTL)
+
+
+# GET with conditional revalidation (If-None-Match / If-Modified-Since).
+# A 304 is answered from the stored body and does not count against the
+# GitHub rate limit.
+async def cached_get(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    params: dict | None = None,
+) -> httpx.Response:
+    key = _cache_key(client, url, headers, params)
+    entry = await _get_entry(key)
+
+    request_headers = dict(headers)
+    if entry is not None:
+        if entry.etag:
+            request_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request_headers["If-Modified-Since"] = entry.last_modified
+
+    response = await client.get(url, headers=request_headers, params=params)
+
+    if response.status_code == 304 and entry is not None:
+        http_cache.hits += 1
+        return httpx.Response(
+            200,
+            headers=entry.headers,
+            content=entry.content,
+            request=response.request,
+        )
+
+    http_cache.misses += 1
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+    if response.status_code == 200 and (etag or last_modified):
+        await _set_entry(
+            key,
+            CacheEntry(
+                content=response.content,
+                headers={
+                    name: response.headers[name]
+                    for name in _REPLAYED_HEADERS
+                    if name in response.headers
+                },
+                etag=etag,
+                last_modified=last_modified,
+            ),
+        )
+    return response
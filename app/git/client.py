@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+import httpx
+
+from app import (
+    GHCR_URL,
+    GITHUB_API_URL,
+    HTTP2,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT,
+)
+from app.git.scheduler import SchedulingTransport
+
+# One long-lived client per upstream host, so connections (and HTTP/2 streams)
+# are reused across commands instead of doing a TLS handshake per request.
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _create_client(base_url: str) -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        transport=SchedulingTransport(transport),
+    )
+
+
+def get_client(base_url: str) -> httpx.AsyncClient:
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = _clients[base_url] = _create_client(base_url)
+    return client
+
+
+def github_client() -> httpx.AsyncClient:
+    return get_client(GITHUB_API_URL)
+
+
+def ghcr_client() -> httpx.AsyncClient:
+    return get_client(GHCR_URL)
+
+
+def open_clients() -> None:
+    github_client()
+    ghcr_client()
+    logging.info(f"Opened HTTP clients for {list(_clients)}")
+
+
+async def close_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*[client.aclose() for client in clients])
+    logging.info("Closed HTTP clients")
@@ -2,12 +2,27 @@ import asyncio
 import re
 from typing import List
 
-import httpx
-
 from app import GITHUB_TOKEN
+from app.git.cache import cached_get
+from app.git.client import github_client
+from app.git.history import cluster_history
+from app.git.mirror import cluster_mirror
 from app.models import ClusterDeployment, DeploymentVersion, Headers, Repository
+from app.utils.metrics import instrument
+from app.utils.singleflight import coalesce
+
+
+def parse_deployment_tag(content: str | None) -> str | None:
+    if not content:
+        return None
+    match = re.search(r"newTag: (\w+)", content)
+    if not match:
+        return None
+    return match.group(1)
 
 
+@coalesce
+@instrument
 async def get_deployment_tag(
     repo: Repository,
     file_path: str,
@@ -16,42 +31,56 @@ async def get_deployment_tag(
         authorization=GITHUB_TOKEN,
         accept=Headers.ACCEPT.RAW_JSON,
     ).to_dict()
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.github.com/repos/{repo}/contents/{file_path}",
-            headers=headers,
-            params={"ref": repo.branch},
-        )
-        response.raise_for_status()
-        content = response.text
-
-    match = re.search(r"newTag: (\w+)", content)
-    if not match:
-        return None
-    return match.group(1)
+    response = await cached_get(
+        github_client(),
+        f"/repos/{repo}/contents/{file_path}",
+        headers=headers,
+        params={"ref": repo.branch},
+    )
+    response.raise_for_status()
+    return parse_deployment_tag(response.text)
 
 
+@coalesce
+@instrument
 async def get_deployment_date(
     repo: Repository,
     file_path: str,
 ) -> str | None:
+    # A failing index falls through to the per-path query
+    if cluster_history.serves(repo) and await cluster_history.try_sync():
+        date = cluster_history.last_modified(file_path)
+        if date:
+            return date
+
     headers = Headers(
         authorization=GITHUB_TOKEN,
         accept=Headers.ACCEPT.RAW_JSON,
     ).to_dict()
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.github.com/repos/{repo}/commits",
-            headers=headers,
-            params={"path": file_path, "page": 1, "per_page": 1},
-        )
-        response.raise_for_status()
-        content = response.json()
+    response = await cached_get(
+        github_client(),
+        f"/repos/{repo}/commits",
+        headers=headers,
+        params={"path": file_path, "page": 1, "per_page": 1},
+    )
+    response.raise_for_status()
+    content = response.json()
 
-        return content[0]["commit"]["committer"]["date"]
+    date = content[0]["commit"]["committer"]["date"]
+    if cluster_history.serves(repo):
+        cluster_history.record(file_path, content[0]["sha"], date)
+    return date
 
 
+@instrument
 async def get_deployment(repo: Repository, file_path: str) -> List[str]:
+    if cluster_mirror.serves(repo):
+        [content, date] = await asyncio.gather(
+            cluster_mirror.read_file(file_path),
+            cluster_mirror.last_modified(file_path),
+        )
+        return [parse_deployment_tag(content), date]
+
     [tag, date] = await asyncio.gather(
         get_deployment_tag(repo, file_path),
         get_deployment_date(repo, file_path),
@@ -63,6 +92,8 @@ async def fake_get_deployment() -> List[None]:
     return [None, None]
 
 
+@coalesce
+@instrument
 async def get_latest_deployments(
     deployment: ClusterDeployment,
     drop_development: bool = False,
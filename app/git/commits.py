@@ -1,22 +1,26 @@
-import httpx
-
 from app import GITHUB_TOKEN
+from app.git.cache import cached_get
+from app.git.client import github_client
 from app.models import Headers, LatestCommit, Repository
+from app.utils.metrics import instrument
+from app.utils.singleflight import coalesce
 
 
+@coalesce
+@instrument
 async def get_latest_commit(repo: Repository) -> LatestCommit:
     headers = Headers(
         authorization=GITHUB_TOKEN,
         accept=Headers.ACCEPT.V3_JSON,
     ).to_dict()
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.github.com/repos/{repo}/commits/{repo.branch}",
-            headers=headers,
-            params={"page": 1, "per_page": 1},
-        )
-        response.raise_for_status()
-        return LatestCommit(
-            commit=response.json()["sha"],
-            date=response.json()["commit"]["committer"]["date"],
-        )
+    response = await cached_get(
+        github_client(),
+        f"/repos/{repo}/commits/{repo.branch}",
+        headers=headers,
+        params={"page": 1, "per_page": 1},
+    )
+    response.raise_for_status()
+    return LatestCommit(
+        commit=response.json()["sha"],
+        date=response.json()["commit"]["committer"]["date"],
+    )
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+
+from app import (
+    DEFAULT_PACKAGE_USERNAME,
+    GHCR_TOKEN_RENEW_BEFORE,
+    GHCR_TOKEN_TTL,
+    GITHUB_TOKEN,
+)
+from app.git.client import ghcr_client
+from app.models import Package
+from app.utils.metrics import instrument
+from app.utils.singleflight import flights
+
+
+class RegistryToken:
+    __slots__ = ("token", "expires_at")
+
+    def __init__(self, token: str, expires_at: float):
+        self.token = token
+        self.expires_at = expires_at
+
+
+# Registry bearer tokens from the /token exchange, cached per scope and renewed
+# in the background shortly before they expire. Concurrent exchanges for the
+# same scope share one request.
+class GhcrAuth:
+    def __init__(self):
+        self.exchanges = 0
+        self._tokens: dict[str, RegistryToken] = {}
+        self._renewals: set[asyncio.Task] = set()
+
+    @instrument
+    async def _exchange(self, scope: str) -> str:
+        response = await ghcr_client().get(
+            "/token",
+            params={"scope": scope, "service": ghcr_client().base_url.host},
+            auth=(DEFAULT_PACKAGE_USERNAME, GITHUB_TOKEN),
+        )
+        response.raise_for_status()
+        content = response.json()
+
+        token = content.get("token") or content["access_token"]
+        expires_in = float(content.get("expires_in") or GHCR_TOKEN_TTL)
+        self._tokens[scope] = RegistryToken(token, time.time() + expires_in)
+        self.exchanges += 1
+        return token
+
+    def _fetch(self, scope: str):
+        return flights.do(f"ghcr_token({scope})", lambda: self._exchange(scope))
+
+    async def _renew(self, scope: str) -> None:
+        try:
+            await self._fetch(scope)
+        except Exception as e:
+            logging.warning(f"Error renewing registry token for {scope}: {e}")
+
+    async def token(self, scope: str) -> str:
+        cached = self._tokens.get(scope)
+        now = time.time()
+        if cached is None or now >= cached.expires_at:
+            return await self._fetch(scope)
+
+        if now >= cached.expires_at - GHCR_TOKEN_RENEW_BEFORE:
+            task = asyncio.create_task(self._renew(scope))
+            self._renewals.add(task)
+            task.add_done_callback(self._renewals.discard)
+        return cached.token
+
+    def invalidate(self, scope: str) -> None:
+        self._tokens.pop(scope, None)
+
+
+ghcr_auth = GhcrAuth()
+
+
+def pull_scope(package: Package) -> str:
+    return f"repository:{package}:pull"
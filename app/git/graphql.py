@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import List, Tuple
+
+from app import GITHUB_GRAPHQL, GITHUB_TOKEN
+from app.git.client import github_client
+from app.git.cluster import get_latest_deployments, parse_deployment_tag
+from app.git.commits import get_latest_commit
+from app.git.history import cluster_history
+from app.git.mirror import cluster_mirror
+from app.models import (
+    ClusterDeployment,
+    DeploymentVersion,
+    Headers,
+    LatestCommit,
+    Repository,
+)
+from app.utils.metrics import instrument
+from app.utils.singleflight import coalesce
+
+
+def _literal(value: str) -> str:
+    # JSON string literals are valid GraphQL string literals
+    return json.dumps(value)
+
+
+def _repository(alias: str, repo: Repository, selection: str) -> str:
+    return f"{alias}: repository(owner: {_literal(repo.owner)}, name: {_literal(repo.repo)}) {{ {selection} }}"
+
+
+def _commit(repo: Repository, selection: str) -> str:
+    return f"ref(qualifiedName: {_literal(repo.branch)}) {{ target {{ ... on Commit {{ {selection} }} }} }}"
+
+
+def _deployment_paths(
+    deployment: ClusterDeployment,
+    drop_development: bool,
+    drop_production: bool,
+) -> List[str | None]:
+    return [
+        deployment.development_path() if not drop_development else None,
+        deployment.production_path() if not drop_production else None,
+    ]
+
+
+def _key(repo: Repository) -> str:
+    return f"{repo}@{repo.branch}"
+
+
+# Aliases are derived from the repository / path so the response can be mapped
+# back without keeping any state between building and parsing the query.
+def _alias(prefix: str, value: str) -> str:
+    return f"{prefix}{hashlib.sha1(value.encode('utf-8')).hexdigest()[:12]}"
+
+
+# Dates already in the cluster history index don't need a history lookup
+def _needs_history(repo: Repository, path: str) -> bool:
+    return not cluster_history.serves(repo) or not cluster_history.last_modified(path)
+
+
+def build_query(
+    repositories: List[Repository],
+    deployments: List[ClusterDeployment],
+    drop_development: bool = False,
+    drop_production: bool = False,
+) -> str | None:
+    # Same repository / file is only queried once, however many entries share it
+    heads: dict[str, Repository] = {}
+    for repo in repositories:
+        heads.setdefault(_key(repo), repo)
+
+    clusters: dict[str, Repository] = {}
+    files: dict[str, set[str]] = {}
+    for deployment in deployments:
+        repo = deployment.repository
+        clusters.setdefault(_key(repo), repo)
+        paths = files.setdefault(_key(repo), set())
+        for path in _deployment_paths(deployment, drop_development, drop_production):
+            if path:
+                paths.add(path)
+
+    parts = [
+        _repository(_alias("r", key), repo, _commit(repo, "oid committedDate"))
+        for key, repo in heads.items()
+    ]
+
+    for key, repo in clusters.items():
+        if not files[key]:
+            continue
+        blobs = " ".join(
+            f"{_alias('f', path)}: object(expression: {_literal(f'{repo.branch}:{path}')}) {{ ... on Blob {{ text }} }}"
+            for path in sorted(files[key])
+        )
+        histories = " ".join(
+            f"{_alias('h', path)}: history(first: 1, path: {_literal(path)}) {{ nodes {{ oid committedDate }} }}"
+            for path in sorted(files[key])
+            if _needs_history(repo, path)
+        )
+        selection = f"{blobs} {_commit(repo, histories)}" if histories else blobs
+        parts.append(_repository(_alias("c", key), repo, selection))
+
+    if not parts:
+        return None
+    return "query { " + " ".join(parts) + " }"
+
+
+@instrument
+async def run_query(query: str) -> dict:
+    headers = Headers(
+        authorization=GITHUB_TOKEN,
+        accept=Headers.ACCEPT.JSON,
+    ).to_dict()
+    response = await github_client().post(
+        "/graphql",
+        headers=headers,
+        json={"query": query},
+    )
+    response.raise_for_status()
+    content = response.json()
+    if content.get("errors"):
+        raise ValueError(f"GraphQL errors: {content['errors']}")
+    return content["data"]
+
+
+# One GraphQL request for every branch head, kustomization blob and
+# kustomization last-commit date, regardless of how many services there are.
+@coalesce
+@instrument
+async def batch_latest_commits_and_deployments(
+    repositories: List[Repository],
+    deployments: List[ClusterDeployment],
+    drop_development: bool = False,
+    drop_production: bool = False,
+) -> Tuple[List[LatestCommit], List[DeploymentVersion]]:
+    # Kustomizations served by the local cluster mirror are left out of the query
+    remote_deployments = [
+        deployment
+        for deployment in deployments
+        if not cluster_mirror.serves(deployment.repository)
+    ]
+    if any(
+        cluster_history.serves(deployment.repository)
+        for deployment in remote_deployments
+    ):
+        # If it fails, last_modified() answers nothing and every path gets a
+        # history lookup in the query instead
+        await cluster_history.try_sync()
+
+    query = build_query(
+        repositories, remote_deployments, drop_development, drop_production
+    )
+    data = await run_query(query) if query else {}
+
+    latest_commits = []
+    for repo in repositories:
+        ref = (data.get(_alias("r", _key(repo))) or {}).get("ref")
+        if not ref:
+            raise ValueError(f"Branch `{repo.branch}` not found in {repo}")
+        latest_commits.append(
+            LatestCommit(
+                commit=ref["target"]["oid"],
+                date=ref["target"]["committedDate"],
+            )
+        )
+
+    latest_versions = []
+    for deployment in deployments:
+        if cluster_mirror.serves(deployment.repository):
+            latest_versions.append(
+                await get_latest_deployments(
+                    deployment,
+                    drop_development=drop_development,
+                    drop_production=drop_production,
+                )
+            )
+            continue
+
+        repository = data.get(_alias("c", _key(deployment.repository))) or {}
+        target = (repository.get("ref") or {}).get("target") or {}
+        indexed = cluster_history.serves(deployment.repository)
+
+        versions = []
+        for path in _deployment_paths(deployment, drop_development, drop_production):
+            if not path:
+                versions.append([None, None])
+                continue
+            blob = repository.get(_alias("f", path)) or {}
+            nodes = (target.get(_alias("h", path)) or {}).get("nodes") or []
+            date = None
+            if nodes:
+                date = nodes[0]["committedDate"]
+                if indexed:
+                    cluster_history.record(path, nodes[0]["oid"], date)
+            elif indexed:
+                date = cluster_history.last_modified(path)
+            versions.append([parse_deployment_tag(blob.get("text")), date])
+
+        [development, production] = versions
+        latest_versions.append(
+            DeploymentVersion(
+                development_version=development[0],
+                production_version=production[0],
+                development_date=development[1],
+                production_date=production[1],
+            )
+        )
+
+    return (latest_commits, latest_versions)
+
+
+@coalesce
+@instrument
+async def get_latest_commits_and_deployments(
+    repositories: List[Repository],
+    deployments: List[ClusterDeployment],
+    drop_development: bool = False,
+    drop_production: bool = False,
+) -> Tuple[List[LatestCommit], List[DeploymentVersion]]:
+    if GITHUB_GRAPHQL:
+        try:
+            return await batch_latest_commits_and_deployments(
+                repositories, deployments, drop_development, drop_production
+            )
+        except Exception as e:
+            logging.warning(f"GraphQL batch failed, falling back to REST: {e}")
+
+    [latest_commits, latest_versions] = await asyncio.gather(
+        asyncio.gather(*[get_latest_commit(repo) for repo in repositories]),
+        asyncio.gather(
+            *[
+                get_latest_deployments(
+                    deployment,
+                    drop_development=drop_development,
+                    drop_production=drop_production,
+                )
+                for deployment in deployments
+            ]
+        ),
+    )
+    return (latest_commits, latest_versions)
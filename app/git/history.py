@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from app import (
+    CLUSTER_HISTORY_INDEX,
+    CLUSTER_HISTORY_MAX_COMMITS,
+    CLUSTER_HISTORY_SEED_COMMITS,
+    DEFAULT_BRANCH,
+    DEFAULT_CLUSTER_REPOSITORY,
+    DEFAULT_REPOSITORY_OWNER,
+    GITHUB_TOKEN,
+)
+from app.git.cache import cached_get
+from app.git.client import github_client
+from app.models import Headers, Repository
+from app.utils.metrics import instrument
+from app.utils.singleflight import coalesce
+
+PAGE_SIZE = 100
+
+
+# path -> (sha, date) of the last commit touching it, built from the cluster
+# repository's history. The index starts from the CLUSTER_HISTORY_SEED_COMMITS
+# most recent commits, then each sync walks only the commits after the last
+# indexed one, and concurrent callers share it. The commit list is revalidated
+# with the ETag cache, so an idle sync costs a single 304. Paths untouched
+# since the seed are filled in by the caller's one-off per-path query, which
+# is also what callers fall back to while syncing fails.
+class HistoryIndex:
+    def __init__(self, repository: Repository):
+        self.repository = repository
+        self.last_sha: str | None = None
+        # False after a failed sync: the index may be behind, so it answers
+        # nothing until a sync succeeds again
+        self.healthy = True
+
+        self._paths: dict[str, tuple[str, str]] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return CLUSTER_HISTORY_INDEX
+
+    def serves(self, repo: Repository) -> bool:
+        return (
+            self.enabled
+            and str(repo) == str(self.repository)
+            and repo.branch == self.repository.branch
+        )
+
+    def _headers(self) -> dict:
+        return Headers(
+            authorization=GITHUB_TOKEN,
+            accept=Headers.ACCEPT.V3_JSON,
+        ).to_dict()
+
+    @instrument
+    async def _commits(self, page: int) -> list[dict]:
+        response = await cached_get(
+            github_client(),
+            f"/repos/{self.repository}/commits",
+            headers=self._headers(),
+            params={
+                "sha": self.repository.branch,
+                "page": page,
+                "per_page": PAGE_SIZE,
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    # Commits are immutable and each is read once, so their (large) payloads
+    # bypass the ETag cache
+    @instrument
+    async def _files(self, sha: str) -> list[str]:
+        response = await github_client().get(
+            f"/repos/{self.repository}/commits/{sha}",
+            headers=self._headers(),
+        )
+        response.raise_for_status()
+        files = []
+        for file in response.json().get("files", []):
+            files.append(file["filename"])
+            if file.get("previous_filename"):
+                files.append(file["previous_filename"])
+        return files
+
+    def record(self, path: str, sha: str, date: str) -> None:
+        # ISO dates in UTC compare correctly as strings
+        current = self._paths.get(path)
+        if current is None or current[1] <= date:
+            self._paths[path] = (sha, date)
+
+    @coalesce
+    @instrument
+    async def sync(self) -> int:
+        async with self._lock:
+            commits = await self._commits(1)
+            if not commits:
+                return 0
+            head = commits[0]["sha"]
+            if self.last_sha is None:
+                return await self._seed(commits)
+
+            first_page = commits
+            new_commits = []
+            page = 1
+            while True:
+                shas = [commit["sha"] for commit in commits]
+                if self.last_sha in shas:
+                    new_commits.extend(commits[: shas.index(self.last_sha)])
+                    break
+                new_commits.extend(commits)
+                if (
+                    len(commits) < PAGE_SIZE
+                    or len(new_commits) >= CLUSTER_HISTORY_MAX_COMMITS
+                ):
+                    # Too far behind (or history rewritten): start over
+                    logging.warning("Cluster history index reset")
+                    self._paths.clear()
+                    return await self._seed(first_page)
+                page += 1
+                commits = await self._commits(page)
+
+            await self._index(new_commits)
+            self.last_sha = head
+            return len(new_commits)
+
+    async def _seed(self, commits: list[dict]) -> int:
+        head = commits[0]["sha"]
+        commits = commits[:CLUSTER_HISTORY_SEED_COMMITS]
+        await self._index(commits)
+        self.last_sha = head
+        return len(commits)
+
+    # Commits newest first, their files are fetched concurrently (the scheduler
+    # caps how many at a time)
+    async def _index(self, commits: list[dict]) -> None:
+        files = await asyncio.gather(
+            *[self._files(commit["sha"]) for commit in commits]
+        )
+        # Oldest first, so the newest commit wins for each path
+        for commit, paths in reversed(list(zip(commits, files))):
+            date = commit["commit"]["committer"]["date"]
+            for path in paths:
+                self.record(path, commit["sha"], date)
+
+    async def try_sync(self) -> bool:
+        try:
+            await self.sync()
+            self.healthy = True
+        except Exception as e:
+            logging.warning(f"Cluster history sync failed: {e}")
+            self.healthy = False
+        return self.healthy
+
+    def last_modified(self, path: str) -> str | None:
+        if not self.healthy:
+            return None
+        entry = self._paths.get(path)
+        return entry[1] if entry else None
+
+
+cluster_history = HistoryIndex(
+    Repository(
+        owner=DEFAULT_REPOSITORY_OWNER,
+        repo=DEFAULT_CLUSTER_REPOSITORY,
+        branch=DEFAULT_BRANCH,
+    )
+)
@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import logging
+import os
+
+from app import (
+    CLUSTER_MIRROR_INTERVAL,
+    CLUSTER_MIRROR_PATH,
+    CLUSTER_MIRROR_URL,
+    DEFAULT_BRANCH,
+    DEFAULT_CLUSTER_REPOSITORY,
+    DEFAULT_REPOSITORY_OWNER,
+    GITHUB_TOKEN,
+)
+from app.models import Repository
+from app.utils.metrics import instrument
+
+
+# Local bare mirror of the Cluster repository. Kustomization tags and dates are
+# read from local git objects, so they don't cost any GitHub API quota.
+class ClusterMirror:
+    def __init__(self, path: str, url: str, repository: Repository):
+        self.path = path
+        self.url = url
+        self.repository = repository
+        self.head: str | None = None
+
+        self._lookups: dict[tuple, str | None] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def serves(self, repo: Repository) -> bool:
+        return (
+            self.head is not None
+            and str(repo) == str(self.repository)
+            and repo.branch == self.repository.branch
+        )
+
+    # Passed as config through the environment rather than `-c` on the command
+    # line, which any user on the host can read
+    def _auth(self) -> dict[str, str]:
+        if not self.url.startswith("https://") or not GITHUB_TOKEN:
+            return {}
+        credentials = base64.b64encode(
+            f"x-access-token:{GITHUB_TOKEN}".encode("utf-8")
+        ).decode("utf-8")
+        return {
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.extraHeader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+        }
+
+    @instrument
+    async def _git(
+        self, *args: str, check: bool = True, env: dict[str, str] | None = None
+    ) -> str | None:
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "TZ": "UTC", "GIT_TERMINAL_PROMPT": "0", **(env or {})},
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            if check:
+                raise RuntimeError(stderr.decode("utf-8").strip())
+            return None
+        return stdout.decode("utf-8")
+
+    # Incremental fetch of the tracked branch only
+    @instrument
+    async def sync(self) -> str:
+        branch = self.repository.branch
+        async with self._lock:
+            if not os.path.isdir(self.path):
+                await self._git("init", "--bare", "--quiet", self.path)
+
+            await self._git(
+                "-C",
+                self.path,
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                self.url,
+                f"+refs/heads/{branch}:refs/heads/{branch}",
+                env=self._auth(),
+            )
+            head = await self._git("-C", self.path, "rev-parse", f"refs/heads/{branch}")
+            head = head.strip()
+
+            if head != self.head:
+                logging.info(f"Cluster mirror updated to {head[:7]}")
+                self._lookups.clear()
+                self.head = head
+            return head
+
+    async def _lookup(self, kind: str, file_path: str, *args: str) -> str | None:
+        # Results are memoized per head, so repeated lookups never leave memory
+        head = self.head
+        key = (head, kind, file_path)
+        if key not in self._lookups:
+            self._lookups[key] = await self._git("-C", self.path, *args, check=False)
+        return self._lookups[key]
+
+    async def read_file(self, file_path: str) -> str | None:
+        return await self._lookup(
+            "content", file_path, "cat-file", "blob", f"{self.head}:{file_path}"
+        )
+
+    async def last_modified(self, file_path: str) -> str | None:
+        date = await self._lookup(
+            "date",
+            file_path,
+            "log",
+            "-1",
+            "--format=%cd",
+            "--date=format-local:%Y-%m-%dT%H:%M:%SZ",
+            self.head,
+            "--",
+            file_path,
+        )
+        if not date:
+            return None
+        return date.strip() or None
+
+    async def _refresh(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logging.error(f"Error syncing cluster mirror: {e}")
+            await asyncio.sleep(CLUSTER_MIRROR_INTERVAL)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._refresh())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+cluster_mirror = ClusterMirror(
+    path=CLUSTER_MIRROR_PATH,
+    url=CLUSTER_MIRROR_URL,
+    repository=Repository(
+        owner=DEFAULT_REPOSITORY_OWNER,
+        repo=DEFAULT_CLUSTER_REPOSITORY,
+        branch=DEFAULT_BRANCH,
+    ),
+)
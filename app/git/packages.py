@@ -1,44 +1,121 @@
-import base64
-from typing import List
+import asyncio
+import logging
+from typing import Dict, List
 
-import httpx
-
-from app import GITHUB_TOKEN
+from app import GHCR_PAGE_SIZE
+from app.git.client import ghcr_client
+from app.git.ghcr_auth import ghcr_auth, pull_scope
+from app.git.tags import COMMIT_TAG, VERSION_TAG, get_tag_index, is_index_unavailable
 from app.models import Headers, LatestImages, Package
+from app.utils.metrics import instrument
+from app.utils.singleflight import coalesce
 
 
-# Encode GITHUB_TOKEN
-def get_ghcr_token() -> str:
-    return base64.b64encode(GITHUB_TOKEN.encode("utf-8")).decode("utf-8")
+# Get list of tags, following the registry's n/last pagination
+@coalesce
+@instrument
+async def get_images(package: Package) -> List[str]:
+    scope = pull_scope(package)
 
+    tags = []
+    url = f"/v2/{package}/tags/list"
+    params = {"n": GHCR_PAGE_SIZE}
+    retried = False
+    while url:
+        headers = Headers(
+            authorization=await ghcr_auth.token(scope),
+            accept=Headers.ACCEPT.V3_JSON,
+        ).to_dict()
+        response = await ghcr_client().get(url, headers=headers, params=params)
 
-# Get list of tags
-async def get_images(package: Package) -> List[str]:
-    ghcr_token = get_ghcr_token()
-    headers = Headers(
-        authorization=ghcr_token,
-        accept=Headers.ACCEPT.V3_JSON,
-    ).to_dict()
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://ghcr.io/v2/{package}/tags/list",
-            headers=headers,
-        )
+        # Token revoked or expired early: exchange a new one once
+        if response.status_code == 401 and not retried:
+            ghcr_auth.invalidate(scope)
+            retried = True
+            continue
         response.raise_for_status()
-        return response.json().get("tags", [])
+        tags.extend(response.json().get("tags") or [])
+
+        # The next page link already carries n and last
+        url = response.links.get("next", {}).get("url")
+        params = None
+    return tags
+
+
+# "<package>:<tag>" -> manifest digest. Version and commit tags aren't moved
+# once pushed, so each is looked up once.
+_digests: Dict[str, str | None] = {}
+
+
+@coalesce
+@instrument
+async def get_digest(package: Package, tag: str) -> str | None:
+    key = f"{package}:{tag}"
+    if key in _digests:
+        return _digests[key]
+
+    scope = pull_scope(package)
+    for retry in (False, True):
+        headers = Headers(
+            authorization=await ghcr_auth.token(scope),
+            accept=Headers.ACCEPT.MANIFEST,
+        ).to_dict()
+        response = await ghcr_client().head(
+            f"/v2/{package}/manifests/{tag}", headers=headers
+        )
+        # Token revoked or expired early: exchange a new one once
+        if response.status_code == 401 and not retry:
+            ghcr_auth.invalidate(scope)
+            continue
+        break
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    _digests[key] = response.headers.get("docker-content-digest")
+    return _digests[key]
+
+
+# The commit tag pushed with the version tag points at the same manifest. The
+# registry lists tags lexically, so list order says nothing about which one.
+async def find_commit_tag(
+    package: Package, version: str, commit_tags: List[str]
+) -> str | None:
+    digest = await get_digest(package, version)
+    if digest is None:
+        return None
+    digests = await asyncio.gather(*[get_digest(package, tag) for tag in commit_tags])
+    return next(
+        (tag for tag, other in zip(commit_tags, digests) if other == digest), None
+    )
 
 
 # Get latest image tags [v0-9, commit hash]
+@coalesce
+@instrument
 async def get_latest_image(package: Package) -> LatestImages:
+    index = get_tag_index(package)
+    try:
+        await index.sync()
+        return index.latest()
+    except Exception as e:
+        if not is_index_unavailable(e):
+            raise
+        logging.warning(f"Tag index unavailable for {package}, listing tags: {e}")
+
     tags = await get_images(package)
 
-    # Filter tags (v0-9)
-    version_tags = [tag for tag in tags if tag.startswith("v") and tag[1:].isdigit()]
+    # Filter tags (v0-9), ordered by version number rather than list order
+    version_tags = sorted(
+        [tag for tag in tags if VERSION_TAG.match(tag)],
+        key=lambda tag: int(tag[1:]),
+    )
+
+    if not version_tags:
+        return LatestImages(version=None, commit=None)
 
     # Filter tags (commit hash)
-    commit_tags = [tag for tag in tags if len(tag) == 40]
-
+    commit_tags = [tag for tag in tags if COMMIT_TAG.match(tag)]
     return LatestImages(
-        version=version_tags[-1] if version_tags else None,
-        commit=commit_tags[-1] if commit_tags else None,
+        version=version_tags[-1],
+        commit=await find_commit_tag(package, version_tags[-1], commit_tags),
     )
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import random
+import time
+
+import httpx
+
+from app import (
+    GITHUB_BACKOFF_BASE,
+    GITHUB_MAX_BACKOFF,
+    GITHUB_MAX_CONCURRENCY,
+    GITHUB_MAX_RETRIES,
+    GITHUB_RATE_LIMIT_RESERVE,
+    GITHUB_SECONDARY_BACKOFF,
+)
+from app.utils.metrics import Counter
+from app.utils.priority import BACKGROUND, INTERACTIVE, background, current_priority
+from app.utils.tracing import span, tag
+
+# How often a request waiting on the rate limit budget checks for promotion
+PRIORITY_CHECK_INTERVAL = 1
+
+upstream_requests = Counter(
+    "upstream_requests_total",
+    "HTTP requests sent upstream, by host and status code",
+    ("host", "status"),
+)
+
+
+class PriorityLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            *_, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class RateLimit:
+    __slots__ = ("limit", "remaining", "reset")
+
+    def __init__(self, limit: int, remaining: int, reset: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+    def to_dict(self) -> dict:
+        return {"limit": self.limit, "remaining": self.remaining, "reset": self.reset}
+
+
+# Fingerprint of the credentials a request is made with, never the token itself
+def token_id(request: httpx.Request) -> str:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return "anonymous"
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:8]
+
+
+def _resource(request: httpx.Request) -> str:
+    return "graphql" if request.url.path == "/graphql" else "core"
+
+
+# Secondary (abuse) limits come back as a 403 or 429 with quota left, only the
+# message and documentation_url tell them apart from a permission error
+def _is_secondary_limit(response: httpx.Response) -> bool:
+    body = response.text.lower()
+    return any(
+        marker in body
+        for marker in (
+            "secondary rate limit",
+            "secondary-rate-limits",
+            "abuse-rate-limits",
+        )
+    )
+
+
+# Every outbound request from app.git goes through here: per-host concurrency
+# cap with priorities, per token/resource budget tracking from the
+# X-RateLimit-* headers, and jittered backoff on primary/secondary rate limits.
+class Scheduler:
+    def __init__(self):
+        self.retries = 0
+        self.throttled = 0
+        self._limiters: dict[str, PriorityLimiter] = {}
+        self._budgets: dict[tuple[str, str, str], RateLimit] = {}
+
+    def _limiter(self, host: str) -> PriorityLimiter:
+        if host not in self._limiters:
+            self._limiters[host] = PriorityLimiter(GITHUB_MAX_CONCURRENCY)
+        return self._limiters[host]
+
+    def _budget_key(self, request: httpx.Request, resource: str) -> tuple:
+        return (request.url.host, token_id(request), resource)
+
+    # Nobody waits out a long rate limit window: interactive requests fail
+    # fast, and background ones don't hold up the callers that may join
+    # their work. The wait is sliced so a background request promoted to
+    # interactive stops waiting for the reserve.
+    async def _wait_for_budget(self, request: httpx.Request) -> None:
+        throttled = False
+        while True:
+            budget = self._budgets.get(self._budget_key(request, _resource(request)))
+            if budget is None:
+                return
+
+            priority = current_priority()
+            reserve = GITHUB_RATE_LIMIT_RESERVE if priority == BACKGROUND else 0
+            wait = budget.reset - time.time()
+            if budget.remaining > reserve or wait <= 0:
+                budget.remaining -= 1
+                return
+
+            if wait > GITHUB_MAX_BACKOFF:
+                if priority == INTERACTIVE:
+                    raise RuntimeError(
+                        f"GitHub rate limit exhausted, resets in {int(wait)} seconds"
+                    )
+                raise RuntimeError(
+                    f"GitHub rate limit reserve reached, resets in {int(wait)} seconds"
+                )
+            if not throttled:
+                throttled = True
+                self.throttled += 1
+                logging.warning(f"Rate limit budget low, waiting {wait:.1f}s")
+            await asyncio.sleep(
+                min(wait + random.uniform(0, 1), PRIORITY_CHECK_INTERVAL)
+            )
+
+    def _update_budget(self, request: httpx.Request, response: httpx.Response):
+        headers = response.headers
+        if "x-ratelimit-remaining" not in headers:
+            return
+        resource = headers.get("x-ratelimit-resource", _resource(request))
+        self._budgets[self._budget_key(request, resource)] = RateLimit(
+            limit=int(headers.get("x-ratelimit-limit", 0)),
+            remaining=int(headers["x-ratelimit-remaining"]),
+            reset=float(headers.get("x-ratelimit-reset", 0)),
+        )
+
+    def _backoff(self, response: httpx.Response, attempt: int) -> float | None:
+        if response.status_code not in (403, 429):
+            return None
+
+        headers = response.headers
+        secondary = _is_secondary_limit(response)
+        if "retry-after" in headers:
+            delay = float(headers["retry-after"])
+        elif headers.get("x-ratelimit-remaining") == "0":
+            delay = float(headers.get("x-ratelimit-reset", 0)) - time.time()
+        elif response.status_code == 429 or secondary:
+            delay = 0
+        else:
+            # A plain 403 is a permission error, not a rate limit
+            return None
+
+        if secondary:
+            delay = max(delay, GITHUB_SECONDARY_BACKOFF)
+            if delay > max(GITHUB_MAX_BACKOFF, GITHUB_SECONDARY_BACKOFF):
+                return None
+            # Spread out the retries of a fan-out that hit the limit together
+            return delay + random.uniform(0, GITHUB_SECONDARY_BACKOFF / 4)
+
+        delay = max(delay, GITHUB_BACKOFF_BASE * 2**attempt)
+        if delay > GITHUB_MAX_BACKOFF:
+            return None
+        return delay + random.uniform(0, GITHUB_BACKOFF_BASE)
+
+    async def send(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        with span(f"{request.method} {request.url.host}", url=str(request.url)):
+            return await self._send(transport, request)
+
+    async def _send(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        limiter = self._limiter(request.url.host)
+
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            await self._wait_for_budget(request)
+
+            await limiter.acquire(current_priority())
+            try:
+                response = await transport.handle_async_request(request)
+                await response.aread()
+            finally:
+                limiter.release()
+
+            upstream_requests.inc(host=request.url.host, status=response.status_code)
+            tag(status=response.status_code, attempts=attempt + 1)
+            self._update_budget(request, response)
+            delay = self._backoff(response, attempt)
+            if delay is None or attempt == GITHUB_MAX_RETRIES:
+                return response
+
+            self.retries += 1
+            logging.warning(
+                f"{response.status_code} from {request.url.host}, retrying in {delay:.1f}s"
+            )
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+    # Per host and resource, the budget closest to running out when several
+    # tokens are in use
+    def rate_limits(self) -> dict[tuple[str, str], RateLimit]:
+        lowest: dict[tuple[str, str], RateLimit] = {}
+        for (host, _, resource), budget in self._budgets.items():
+            key = (host, resource)
+            if key not in lowest or budget.remaining < lowest[key].remaining:
+                lowest[key] = budget
+        return lowest
+
+    def limiters(self) -> dict[str, PriorityLimiter]:
+        return dict(self._limiters)
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "hosts": {
+                host: {"active": limiter.active, "queued": limiter.queued}
+                for host, limiter in self._limiters.items()
+            },
+            "rate_limits": {
+                f"{host}/{token}/{resource}": budget.to_dict()
+                for (host, token, resource), budget in self._budgets.items()
+            },
+        }
+
+
+scheduler = Scheduler()
+
+
+class SchedulingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await scheduler.send(self.transport, request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,142 @@
+import asyncio
+import bisect
+import re
+import urllib.parse
+
+import httpx
+
+from app import GITHUB_TOKEN, TAG_INDEX_PAGE_SIZE, TAG_INDEX_SIZE
+from app.git.cache import cached_get
+from app.git.client import github_client
+from app.models import Headers, LatestImages, Package
+from app.utils.metrics import instrument
+
+VERSION_TAG = re.compile(r"^v(\d+)$")
+COMMIT_TAG = re.compile(r"^[0-9a-f]{40}$")
+
+
+# Incremental index of a container package's tags. Package versions are listed
+# newest first, so a sync only reads the versions published since the last one
+# it has seen, plus the first page again: tags can be added to a version after
+# it was published. Version numbers are kept sorted (latest is the last item)
+# and mapped to the commit tag pushed with the same image, for at most
+# TAG_INDEX_SIZE versions.
+class TagIndex:
+    def __init__(self, package: Package, max_size: int = TAG_INDEX_SIZE):
+        self.package = package
+        self.max_size = max_size
+        self.last_seen_id: int | None = None
+
+        self._versions: list[int] = []
+        self._commits: dict[int, str] = {}
+        self._latest_commit: str | None = None
+        self._owner_type = "orgs"
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def _url(self) -> str:
+        name = urllib.parse.quote(self.package.image, safe="")
+        return f"/{self._owner_type}/{self.package.username}/packages/container/{name}/versions"
+
+    @instrument
+    async def _page(self, page: int) -> list[dict]:
+        headers = Headers(
+            authorization=GITHUB_TOKEN,
+            accept=Headers.ACCEPT.JSON,
+        ).to_dict()
+        response = await cached_get(
+            github_client(),
+            self._url(),
+            headers=headers,
+            params={"page": page, "per_page": TAG_INDEX_PAGE_SIZE},
+        )
+        # Packages can be owned by an organization or a user
+        if response.status_code == 404 and self._owner_type == "orgs":
+            self._owner_type = "users"
+            return await self._page(page)
+        response.raise_for_status()
+        return response.json()
+
+    def add(self, tags: list[str]) -> None:
+        version = None
+        commit = None
+        for tag in tags:
+            if match := VERSION_TAG.match(tag):
+                version = int(match.group(1))
+            elif COMMIT_TAG.match(tag):
+                commit = tag
+
+        if commit:
+            self._latest_commit = commit
+        if version is None:
+            return
+
+        index = bisect.bisect_left(self._versions, version)
+        if index == len(self._versions) or self._versions[index] != version:
+            self._versions.insert(index, version)
+        if commit:
+            self._commits[version] = commit
+
+        while len(self._versions) > self.max_size:
+            self._commits.pop(self._versions.pop(0), None)
+
+    @instrument
+    async def sync(self) -> int:
+        async with self._lock:
+            read = []
+            published = 0
+            page = 1
+            while len(read) < self.max_size:
+                versions = await self._page(page)
+                new = [
+                    version
+                    for version in versions
+                    if self.last_seen_id is None or version["id"] > self.last_seen_id
+                ]
+                # The first page is revalidated through the ETag cache, so
+                # re-reading it costs a 304 when nothing changed
+                read.extend(versions if page == 1 else new)
+                published += len(new)
+                if len(new) < len(versions) or len(versions) < TAG_INDEX_PAGE_SIZE:
+                    break
+                page += 1
+
+            # Oldest first, so the newest image ends up as the latest commit
+            for version in reversed(read):
+                self.add(version["metadata"]["container"]["tags"])
+            if read:
+                self.last_seen_id = max(
+                    self.last_seen_id or 0, *[version["id"] for version in read]
+                )
+            return published
+
+    def commit_for(self, tag: str) -> str | None:
+        match = VERSION_TAG.match(tag)
+        return self._commits.get(int(match.group(1))) if match else None
+
+    def latest(self) -> LatestImages:
+        if not self._versions:
+            return LatestImages(version=None, commit=self._latest_commit)
+        version = self._versions[-1]
+        return LatestImages(
+            version=f"v{version}",
+            commit=self._commits.get(version, self._latest_commit),
+        )
+
+
+_indexes: dict[str, TagIndex] = {}
+
+
+def get_tag_index(package: Package) -> TagIndex:
+    key = str(package)
+    if key not in _indexes:
+        _indexes[key] = TagIndex(package)
+    return _indexes[key]
+
+
+def is_index_unavailable(error: Exception) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and (
+        error.response.status_code in (401, 403, 404)
+    )
@@ -1,22 +1,37 @@
-import httpx
+import logging
 
-from app import GITHUB_TOKEN
-from app.models import Headers, Repository
+from app import DISPATCH_DEDUP_TTL, GITHUB_TOKEN
+from app.git.client import github_client
+from app.models import DispatchStatus, Headers, Repository
+from app.utils.idempotency import idempotency
+from app.utils.metrics import instrument
 
 
+@instrument
 async def dispatch_workflow(
     repo: Repository,
     workflow: str,
-) -> bool:
+) -> DispatchStatus:
+    # A run dispatched for the same ref moments ago already covers this one
+    key = f"{repo}@{repo.branch}:{workflow}"
+    if not idempotency.claim("dispatch", key, ttl=DISPATCH_DEDUP_TTL):
+        logging.info(f"Skipping duplicate dispatch of {key}")
+        return DispatchStatus.DUPLICATE
+
     headers = Headers(
         authorization=GITHUB_TOKEN,
         accept=Headers.ACCEPT.JSON,
     ).to_dict()
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"https://api.github.com/repos/{repo}/actions/workflows/{workflow}/dispatches",
+    try:
+        response = await github_client().post(
+            f"/repos/{repo}/actions/workflows/{workflow}/dispatches",
             headers=headers,
             json={"ref": repo.branch},
         )
         response.raise_for_status()
-        return response.status_code == 204
+    except Exception:
+        idempotency.release("dispatch", key)
+        raise
+    if response.status_code != 204:
+        return DispatchStatus.FAILED
+    return DispatchStatus.DISPATCHED
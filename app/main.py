@@ -1,11 +1,35 @@
+import json
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import BackgroundTasks, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from slack_bolt import BoltResponse
 from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
 from slack_bolt.async_app import AsyncApp
+from slack_sdk.signature import SignatureVerifier
 
-from app import BOT_TOKEN, SIGNING_SECRET
+from app import (
+    BOT_TOKEN,
+    SIGNING_SECRET,
+    SLACK_EVENT_TYPES,
+    SLACK_IGNORED_SUBTYPES,
+)
+from app.cache import shared_cache
+from app.git import close_clients, cluster_mirror, open_clients
+from app.state import deployment_store, handle_event, verify_signature
+from app.utils import (
+    Counter,
+    close_pools,
+    close_trace_file,
+    idempotency,
+    loop_monitor,
+    mark,
+    ping_databases,
+    registry,
+    report_startup,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s:\t  %(message)s")
 logging.getLogger("uvicorn.access").addFilter(
@@ -19,12 +43,84 @@ app = AsyncApp(
 )
 
 
+def get_request_key(body: dict) -> tuple[str, str] | None:
+    if body.get("event_id"):
+        return ("event", body["event_id"])
+    if body.get("command") and body.get("trigger_id"):
+        return ("command", body["trigger_id"])
+    if body.get("type") == "block_actions" and body.get("trigger_id"):
+        return ("action", body["trigger_id"])
+    return None
+
+
+# Slack redelivers events it didn't see acknowledged in time (X-Slack-Retry-Num),
+# so the same envelope can arrive more than once. Only the first is handled,
+# duplicates are acknowledged and dropped.
+@app.middleware
+async def deduplicate_requests(body, req, next):
+    key = get_request_key(body)
+    if key is None or idempotency.claim(*key):
+        return await next()
+
+    retry = req.headers.get("x-slack-retry-num", ["0"])[0]
+    logging.info(f"Dropping duplicate Slack {key[0]} {key[1]} (retry {retry})")
+    return BoltResponse(status=200, body="")
+
+
 app_handler = AsyncSlackRequestHandler(app)
+signature_verifier = SignatureVerifier(SIGNING_SECRET)
+
+dropped_events = Counter(
+    "slack_events_dropped_total",
+    "Event callbacks acknowledged without dispatching, by type (or type.subtype)",
+    ("type",),
+)
+
+
+# Cheap pre-dispatch check, so high-volume channel traffic nobody listens to
+# doesn't pay for Bolt's parsing and middleware.
+def get_drop_reason(body: bytes) -> str | None:
+    # Commands and actions are form encoded, only event callbacks are filtered
+    if b'"event_callback"' not in body:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if payload.get("type") != "event_callback":
+        return None
+
+    event = payload.get("event") or {}
+    if event.get("type") not in SLACK_EVENT_TYPES:
+        return str(event.get("type"))
+    if event.get("subtype") in SLACK_IGNORED_SUBTYPES:
+        return f"{event['type']}.{event['subtype']}"
+    return None
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    loop_monitor.start()
+    open_clients()
+    cluster_mirror.start()
+    deployment_store.start()
+    mark("ready")
+    report_startup()
+    yield
+    await deployment_store.stop()
+    await cluster_mirror.stop()
+    await close_clients()
+    await close_pools()
+    await shared_cache.close()
+    await close_trace_file()
+    await loop_monitor.stop()
+
 
 api = FastAPI(
     title="Slack Bot",
     description="A Slack Bot for managing deployments and more!",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 api.add_middleware(
@@ -41,9 +137,52 @@ async def root():
     return {"message": "Welcome to the Slack Bot!"}
 
 
+# Unavailable (503) while a database /get exports from doesn't answer
+@api.get("/health")
+async def health():
+    databases = await ping_databases()
+    healthy = all(databases.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": "ok" if healthy else "degraded", "databases": databases},
+    )
+
+
+@api.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @api.post("/slack/events")
 async def endpoint(req: Request):
+    body = await req.body()
+    reason = get_drop_reason(body)
+    # Unsigned requests go on to Bolt, which rejects them
+    if reason and signature_verifier.is_valid_request(body, dict(req.headers)):
+        dropped_events.inc(type=reason)
+        return Response(status_code=200)
     return await app_handler.handle(req)
 
 
+@api.post("/github/webhooks")
+async def github_webhooks(req: Request, background_tasks: BackgroundTasks):
+    body = await req.body()
+    if not verify_signature(body, req.headers.get("X-Hub-Signature-256")):
+        return JSONResponse(status_code=401, content={"message": "Invalid signature"})
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"message": "Invalid JSON"})
+
+    # Answer GitHub right away, the state update may need upstream calls
+    background_tasks.add_task(handle_event, req.headers.get("X-GitHub-Event"), payload)
+    return {"message": "Accepted"}
+
+
 import app.events
+import app.metrics
+
+mark("imports")
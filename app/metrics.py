@@ -0,0 +1,153 @@
+import asyncio
+
+from app.git import http_cache, scheduler
+from app.state import deployment_store
+from app.utils import (
+    Counter,
+    Gauge,
+    flights,
+    idempotency,
+    loop_monitor,
+    pools,
+    registry,
+)
+
+# Scrape-time views of the stats the app already keeps. Labels are limited to
+# hosts, rate limit resources and fixed kinds, nothing per request.
+
+
+def _rate_limits(attribute: str) -> dict:
+    return {
+        key: getattr(budget, attribute)
+        for key, budget in scheduler.rate_limits().items()
+    }
+
+
+def _tasks() -> dict:
+    try:
+        return {(): len(asyncio.all_tasks())}
+    except RuntimeError:
+        # No running loop, e.g. rendered from another thread
+        return {}
+
+
+Gauge(
+    "github_rate_limit_remaining",
+    "Requests left in the current rate limit window",
+    ("host", "resource"),
+    collect=lambda: _rate_limits("remaining"),
+)
+Gauge(
+    "github_rate_limit_limit",
+    "Size of the current rate limit window",
+    ("host", "resource"),
+    collect=lambda: _rate_limits("limit"),
+)
+Counter(
+    "upstream_retries_total",
+    "Upstream requests retried after a rate limit response",
+    collect=lambda: {(): scheduler.retries},
+)
+Counter(
+    "upstream_throttled_total",
+    "Upstream requests delayed to stay within the rate limit budget",
+    collect=lambda: {(): scheduler.throttled},
+)
+Gauge(
+    "upstream_requests_active",
+    "Upstream requests holding a concurrency slot",
+    ("host",),
+    collect=lambda: {
+        (host,): limiter.active for host, limiter in scheduler.limiters().items()
+    },
+)
+Gauge(
+    "upstream_requests_queued",
+    "Upstream requests waiting for a concurrency slot",
+    ("host",),
+    collect=lambda: {
+        (host,): limiter.queued for host, limiter in scheduler.limiters().items()
+    },
+)
+Counter(
+    "http_cache_requests_total",
+    "Conditional GETs by outcome (hit is a 304 served from the cache)",
+    ("outcome",),
+    collect=lambda: {
+        ("hit",): http_cache.hits,
+        ("miss",): http_cache.misses,
+        ("shared_hit",): http_cache.shared_hits,
+    },
+)
+Gauge(
+    "http_cache_hit_ratio",
+    "Share of conditional GETs answered by a 304",
+    collect=lambda: {(): http_cache.stats()["hit_ratio"]},
+)
+Gauge(
+    "http_cache_entries",
+    "Responses held in the in-process ETag cache",
+    collect=lambda: {(): len(http_cache)},
+)
+Gauge(
+    "singleflight_in_flight",
+    "Coalesced upstream calls currently running",
+    collect=lambda: {(): flights.totals()["in_flight"]},
+)
+Counter(
+    "singleflight_deduplicated_total",
+    "Calls that joined an in-flight call instead of running",
+    collect=lambda: {(): flights.totals()["deduplicated"]},
+)
+Counter(
+    "idempotency_suppressed_total",
+    "Duplicate Slack deliveries, deploys and dispatches suppressed",
+    ("kind",),
+    collect=lambda: {
+        (kind,): stats["suppressed"]
+        for kind, stats in idempotency.stats()["kinds"].items()
+    },
+)
+Gauge(
+    "deployment_store_version",
+    "Version of the deployment state",
+    collect=lambda: {(): deployment_store.stats()["version"]},
+)
+Gauge(
+    "deployment_store_fetches_in_flight",
+    "Batched deployment fetches currently running",
+    collect=lambda: {(): deployment_store.stats()["fetches"]},
+)
+Gauge(
+    "asyncio_tasks",
+    "Tasks alive on the event loop",
+    collect=_tasks,
+)
+Gauge(
+    "event_loop_lag_seconds",
+    "Scheduling delay of the event loop over the last LOOP_LAG_WINDOW samples",
+    ("quantile",),
+    collect=lambda: {
+        (str(quantile),): lag for quantile, lag in loop_monitor.percentiles().items()
+    },
+)
+Gauge(
+    "event_loop_lag_max_seconds",
+    "Largest scheduling delay over the last LOOP_LAG_WINDOW samples",
+    collect=lambda: {(): loop_monitor.max_lag()},
+)
+Counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked for over LOOP_BLOCK_THRESHOLD",
+    collect=lambda: {(): loop_monitor.blocked},
+)
+Gauge(
+    "db_pool_connections",
+    "Database connections by pool and state",
+    ("database", "state"),
+    collect=lambda: {
+        (database, state): getattr(pool, state)
+        for database, pool in pools().items()
+        for state in ("in_use", "idle")
+    },
+)
@@ -1,6 +1,9 @@
 from .cluster_deployment import *
 from .deployment import *
+from .deployment_field import *
+from .deployment_snapshot import *
 from .deployment_version import *
+from .dispatch_status import *
 from .headers import *
 from .latest_commit import *
 from .latest_images import *
@@ -45,3 +45,6 @@ class ClusterDeployment(BaseModel):
 
     def production_path(self) -> str:
         return f"{self.base_path}/{self.production}"
+
+    class Config:
+        frozen = True
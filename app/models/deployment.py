@@ -21,3 +21,6 @@ class Deployment(BaseModel):
     latest_image: LatestImages = None
     latest_commit: LatestCommit = None
     latest_version: DeploymentVersion = None
+
+    class Config:
+        frozen = True
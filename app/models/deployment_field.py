@@ -0,0 +1,15 @@
+from enum import StrEnum
+from typing import FrozenSet
+
+
+class DeploymentField(StrEnum):
+    LATEST_IMAGE = "latest_image"
+    LATEST_COMMIT = "latest_commit"
+    DEVELOPMENT_VERSION = "development_version"
+    PRODUCTION_VERSION = "production_version"
+
+
+ALL_FIELDS: FrozenSet[DeploymentField] = frozenset(DeploymentField)
+VERSION_FIELDS: FrozenSet[DeploymentField] = frozenset(
+    {DeploymentField.DEVELOPMENT_VERSION, DeploymentField.PRODUCTION_VERSION}
+)
@@ -0,0 +1,37 @@
+import datetime
+from typing import Dict, List, Tuple
+
+from pydantic import BaseModel
+
+from app.models.deployment import Deployment
+
+
+# An immutable view of the store at one version. Deployments are the static
+# registry entries with their fetched state applied; unchanged ones are shared
+# between versions, so any number of commands can read a snapshot concurrently.
+class DeploymentSnapshot(BaseModel):
+    version: int
+    deployments: Tuple[Deployment, ...]
+
+    # deployment id -> field -> unix time it was fetched
+    fetched_at: Dict[str, Dict[str, float]]
+
+    def oldest(self, ids: List[str] | None = None) -> float | None:
+        timestamps = [
+            timestamp
+            for deployment_id, fields in self.fetched_at.items()
+            if ids is None or deployment_id in ids
+            for timestamp in fields.values()
+        ]
+        return min(timestamps) if timestamps else None
+
+    def as_of(self, ids: List[str] | None = None) -> str | None:
+        oldest = self.oldest(ids)
+        if oldest is None:
+            return None
+        return datetime.datetime.fromtimestamp(
+            oldest, datetime.timezone.utc
+        ).isoformat()
+
+    class Config:
+        frozen = True
@@ -10,3 +10,6 @@ class DeploymentVersion(BaseModel):
 
     def __str__(self) -> str:
         return f"production: {self.production_version}, development: {self.development_version}"
+
+    class Config:
+        frozen = True
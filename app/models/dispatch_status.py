@@ -0,0 +1,8 @@
+from enum import StrEnum
+
+
+class DispatchStatus(StrEnum):
+    DISPATCHED = "dispatched"
+    # The same workflow was dispatched for the same ref within DISPATCH_DEDUP_TTL
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
@@ -17,3 +17,9 @@ class Headers(BaseModel):
         JSON = "application/vnd.github+json"
         V3_JSON = "application/vnd.github.v3+json"
         RAW_JSON = "application/vnd.github.raw+json"
+        MANIFEST = (
+            "application/vnd.oci.image.index.v1+json, "
+            "application/vnd.oci.image.manifest.v1+json, "
+            "application/vnd.docker.distribution.manifest.list.v2+json, "
+            "application/vnd.docker.distribution.manifest.v2+json"
+        )
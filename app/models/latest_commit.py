@@ -10,3 +10,6 @@ class LatestCommit(BaseModel):
 
     def sha(self):
         return self.commit[:7]
+
+    class Config:
+        frozen = True
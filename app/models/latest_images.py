@@ -2,11 +2,14 @@ from pydantic import BaseModel
 
 
 class LatestImages(BaseModel):
-    version: str
-    commit: str
+    version: str | None
+    commit: str | None
 
     def __str__(self):
         return f"version: {self.version}, commit: {self.commit}"
 
     def sha(self):
-        return self.commit[:7]
+        return self.commit[:7] if self.commit else None
+
+    class Config:
+        frozen = True
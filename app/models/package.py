@@ -12,3 +12,4 @@ class Package(BaseModel):
 
     class Config:
         str_to_lower = True
+        frozen = True
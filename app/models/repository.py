@@ -10,3 +10,6 @@ class Repository(BaseModel):
 
     def __str__(self):
         return f"{self.owner}/{self.repo}"
+
+    class Config:
+        frozen = True
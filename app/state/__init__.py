@@ -0,0 +1,3 @@
+from .planner import *
+from .store import *
+from .webhooks import *
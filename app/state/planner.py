@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+from app.git import get_latest_commits_and_deployments, get_latest_image
+from app.models import (
+    ClusterDeployment,
+    Deployment,
+    DeploymentField,
+    Package,
+    Repository,
+)
+from app.utils.tracing import span
+
+# (version, date) of a kustomization
+ClusterVersion = Tuple[str | None, str | None]
+
+# deployment id -> field -> value
+Values = Dict[str, Dict[DeploymentField, Any]]
+
+
+def _repository_key(repo: Repository) -> str:
+    return f"{repo}@{repo.branch}"
+
+
+def _cluster_key(deployment: ClusterDeployment) -> str:
+    return (
+        f"{_repository_key(deployment.repository)}:"
+        f"{deployment.development_path()}:{deployment.production_path()}"
+    )
+
+
+# The upstream calls needed to load a set of fields for some deployments, each
+# package, repository and kustomization appearing once however many services
+# share it.
+@dataclass
+class QueryPlan:
+    deployments: List[Deployment]
+    fields: FrozenSet[DeploymentField]
+    packages: Dict[str, Package] = field(default_factory=dict)
+    repositories: Dict[str, Repository] = field(default_factory=dict)
+    clusters: Dict[str, ClusterDeployment] = field(default_factory=dict)
+
+    @property
+    def drop_development(self) -> bool:
+        return DeploymentField.DEVELOPMENT_VERSION not in self.fields
+
+    @property
+    def drop_production(self) -> bool:
+        return DeploymentField.PRODUCTION_VERSION not in self.fields
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.packages)} packages, {len(self.repositories)} repositories, "
+            f"{len(self.clusters)} kustomizations for {', '.join(sorted(self.fields))}"
+        )
+
+
+@dataclass
+class QueryResult:
+    # Only the fields that were loaded
+    values: Values
+    errors: List[Exception]
+
+
+def plan(deployments: List[Deployment], fields: Iterable[DeploymentField]) -> QueryPlan:
+    query_plan = QueryPlan(deployments=deployments, fields=frozenset(fields))
+    for deployment in deployments:
+        if DeploymentField.LATEST_IMAGE in query_plan.fields:
+            query_plan.packages[str(deployment.package)] = deployment.package
+        if DeploymentField.LATEST_COMMIT in query_plan.fields:
+            repo = deployment.repository
+            query_plan.repositories[_repository_key(repo)] = repo
+        if not (query_plan.drop_development and query_plan.drop_production):
+            cluster = deployment.deployments
+            query_plan.clusters[_cluster_key(cluster)] = cluster
+    return query_plan
+
+
+async def _load_images(
+    query_plan: QueryPlan, deliver: Callable[[Values], None]
+) -> None:
+    async def load_image(key: str) -> None:
+        ids = [
+            deployment.id
+            for deployment in query_plan.deployments
+            if str(deployment.package) == key
+        ]
+        with span("latest_image", service=",".join(ids)):
+            image = await get_latest_image(query_plan.packages[key])
+        deliver({id: {DeploymentField.LATEST_IMAGE: image} for id in ids})
+
+    await asyncio.gather(*[load_image(key) for key in query_plan.packages])
+
+
+async def _load_commits_and_versions(
+    query_plan: QueryPlan, deliver: Callable[[Values], None]
+) -> None:
+    if not query_plan.repositories and not query_plan.clusters:
+        return
+
+    repository_keys = list(query_plan.repositories)
+    cluster_keys = list(query_plan.clusters)
+    [latest_commits, latest_versions] = await get_latest_commits_and_deployments(
+        [query_plan.repositories[key] for key in repository_keys],
+        [query_plan.clusters[key] for key in cluster_keys],
+        drop_development=query_plan.drop_development,
+        drop_production=query_plan.drop_production,
+    )
+    commits = dict(zip(repository_keys, latest_commits))
+
+    versions: Dict[str, Dict[DeploymentField, ClusterVersion]] = {}
+    for key, latest_version in zip(cluster_keys, latest_versions):
+        versions[key] = {}
+        if not query_plan.drop_development:
+            versions[key][DeploymentField.DEVELOPMENT_VERSION] = (
+                latest_version.development_version,
+                latest_version.development_date,
+            )
+        if not query_plan.drop_production:
+            versions[key][DeploymentField.PRODUCTION_VERSION] = (
+                latest_version.production_version,
+                latest_version.production_date,
+            )
+
+    values = {}
+    for deployment in query_plan.deployments:
+        values[deployment.id] = dict(
+            versions.get(_cluster_key(deployment.deployments), {})
+        )
+        if DeploymentField.LATEST_COMMIT in query_plan.fields:
+            values[deployment.id][DeploymentField.LATEST_COMMIT] = commits[
+                _repository_key(deployment.repository)
+            ]
+    deliver(values)
+
+
+# Images and commits/kustomizations are loaded independently: a failing source
+# doesn't discard what the other one returned. Values are handed to on_values
+# as each source (each image, the commits/kustomizations batch) arrives.
+async def execute(
+    query_plan: QueryPlan, on_values: Callable[[Values], None] | None = None
+) -> QueryResult:
+    values: Values = {deployment.id: {} for deployment in query_plan.deployments}
+
+    def deliver(update: Values) -> None:
+        for deployment_id, fields in update.items():
+            values[deployment_id].update(fields)
+        if on_values is not None:
+            on_values(update)
+
+    results = await asyncio.gather(
+        _load_images(query_plan, deliver),
+        _load_commits_and_versions(query_plan, deliver),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    return QueryResult(values=values, errors=errors)
+
+
+async def load(
+    deployments: List[Deployment],
+    fields: Iterable[DeploymentField],
+    on_values: Callable[[Values], None] | None = None,
+) -> QueryResult:
+    return await execute(plan(deployments, fields), on_values)
@@ -0,0 +1,423 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from app import REFRESH_INTERVAL, SNAPSHOT_TTL
+from app.cache import shared_cache
+from app.deployments import deployments
+from app.models import (
+    ALL_FIELDS,
+    Deployment,
+    DeploymentField,
+    DeploymentSnapshot,
+    DeploymentVersion,
+    LatestCommit,
+    LatestImages,
+)
+from app.state.planner import Values, load
+from app.utils.priority import background, spawn
+from app.utils.singleflight import coalesce
+from app.utils.tracing import span
+
+
+def _flight_key(
+    targets: List[Deployment], fields: Iterable[DeploymentField]
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    return (
+        tuple(deployment.id for deployment in targets),
+        tuple(sorted(fields)),
+    )
+
+
+def _dump_field(value: Any) -> Any:
+    if isinstance(value, (LatestImages, LatestCommit)):
+        return value.model_dump()
+    return value
+
+
+def _load_field(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if field == DeploymentField.LATEST_IMAGE:
+        return LatestImages(**value)
+    if field == DeploymentField.LATEST_COMMIT:
+        return LatestCommit(**value)
+    return tuple(value)
+
+
+# In-memory deployment state, refreshed in the background and by GitHub
+# webhooks. Commands get the current snapshot straight away (stale while
+# revalidate) and only wait for GitHub for the fields they render.
+class DeploymentStore:
+    def __init__(self, registry: List[Deployment]):
+        self.registry = registry
+        self.version = 0
+
+        # Fetched state is kept apart from the (frozen) registry entries. Each
+        # deployment's dicts are replaced rather than mutated, so snapshots can
+        # share them without copying.
+        self._state: Dict[str, Dict[str, Any]] = {d.id: {} for d in registry}
+        self._fetched_at: Dict[str, Dict[str, float]] = {d.id: {} for d in registry}
+        self._composed: Dict[str, Deployment] = {}
+        self._snapshot: DeploymentSnapshot | None = None
+        self._task: asyncio.Task | None = None
+        self._revalidations: Dict[Tuple, asyncio.Task] = {}
+        self._fetches: Set[asyncio.Task] = set()
+        # Set, then replaced, whenever a deployment's state changes
+        self._updated = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return all(self.is_complete(deployment_id) for deployment_id in self._state)
+
+    def missing(
+        self, deployment_id: str, fields: FrozenSet[DeploymentField] = ALL_FIELDS
+    ) -> FrozenSet[DeploymentField]:
+        return frozenset(
+            field for field in fields if field not in self._state[deployment_id]
+        )
+
+    def is_complete(
+        self, deployment_id: str, fields: FrozenSet[DeploymentField] = ALL_FIELDS
+    ) -> bool:
+        return not self.missing(deployment_id, fields)
+
+    def set(self, deployment_id: str, **fields: Any) -> None:
+        now = time.time()
+        self._update(deployment_id, fields, {field: now for field in fields})
+
+    def _update(
+        self,
+        deployment_id: str,
+        fields: Dict[str, Any],
+        fetched_at: Dict[str, float],
+    ) -> None:
+        self._state[deployment_id] = {**self._state[deployment_id], **fields}
+        self._fetched_at[deployment_id] = {
+            **self._fetched_at[deployment_id],
+            **fetched_at,
+        }
+        self._composed.pop(deployment_id, None)
+        self.version += 1
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    # Take the fields another worker fetched more recently than this one
+    async def restore(self, targets: List[Deployment] | None = None) -> None:
+        if not shared_cache.shared:
+            return
+        for deployment in self.registry if targets is None else targets:
+            value = await shared_cache.get(f"deployment:{deployment.id}")
+            if value is None:
+                continue
+            fetched_at = self._fetched_at[deployment.id]
+            newer = {
+                field: (data, timestamp)
+                for field, (data, timestamp) in json.loads(value).items()
+                if timestamp > fetched_at.get(field, 0)
+            }
+            if newer:
+                self._update(
+                    deployment.id,
+                    {
+                        field: _load_field(field, data)
+                        for field, (data, _) in newer.items()
+                    },
+                    {field: timestamp for field, (_, timestamp) in newer.items()},
+                )
+
+    async def save(self, targets: List[Deployment]) -> None:
+        if not shared_cache.shared:
+            return
+        await self.restore(targets)
+        for deployment in targets:
+            state = self._state[deployment.id]
+            fetched_at = self._fetched_at[deployment.id]
+            value = {
+                field: [_dump_field(data), fetched_at[field]]
+                for field, data in state.items()
+            }
+            await shared_cache.set(
+                f"deployment:{deployment.id}", json.dumps(value).encode("utf-8")
+            )
+
+    # Rebuilt only after the deployment's state changes
+    def _compose(self, deployment: Deployment) -> Deployment:
+        composed = self._composed.get(deployment.id)
+        if composed is None:
+            composed = self._composed[deployment.id] = self._apply(deployment)
+        return composed
+
+    def _apply(self, deployment: Deployment) -> Deployment:
+        state = self._state[deployment.id]
+        update = {
+            field: state[field]
+            for field in (DeploymentField.LATEST_IMAGE, DeploymentField.LATEST_COMMIT)
+            if field in state
+        }
+        if (
+            DeploymentField.DEVELOPMENT_VERSION in state
+            or DeploymentField.PRODUCTION_VERSION in state
+        ):
+            development = state.get(DeploymentField.DEVELOPMENT_VERSION, (None, None))
+            production = state.get(DeploymentField.PRODUCTION_VERSION, (None, None))
+            update["latest_version"] = DeploymentVersion(
+                development_version=development[0],
+                development_date=development[1],
+                production_version=production[0],
+                production_date=production[1],
+            )
+        return deployment.model_copy(update=update)
+
+    def snapshot(self) -> DeploymentSnapshot:
+        # Built once per version and shared by every command reading it. The
+        # parts are already valid, so validation is skipped.
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = DeploymentSnapshot.model_construct(
+                version=self.version,
+                deployments=tuple(
+                    self._compose(deployment) for deployment in self.registry
+                ),
+                fetched_at=dict(self._fetched_at),
+            )
+        return self._snapshot
+
+    def is_stale(
+        self,
+        targets: List[Deployment] | None = None,
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> bool:
+        timestamps = [
+            self._fetched_at[deployment.id].get(field)
+            for deployment in (self.registry if targets is None else targets)
+            for field in fields
+        ]
+        if not timestamps or None in timestamps:
+            return True
+        return time.time() - min(timestamps) > SNAPSHOT_TTL
+
+    # The current snapshot, for a page of deployments that already have the
+    # fields it shows. Stale fields are revalidated in the background.
+    def view(
+        self,
+        targets: List[Deployment],
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> DeploymentSnapshot:
+        if self.is_stale(targets, fields):
+            self.revalidate(targets, fields)
+        return self.snapshot()
+
+    def revalidate(
+        self,
+        targets: List[Deployment] | None = None,
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> None:
+        key = _flight_key(self.registry if targets is None else targets, fields)
+        if key in self._revalidations:
+            return
+        with background():
+            task = self._revalidations[key] = asyncio.create_task(
+                self._safe_refresh(targets, fields)
+            )
+        task.add_done_callback(lambda _: self._revalidations.pop(key, None))
+
+    # With a shared cache, workers take turns per key: whoever gets the lock
+    # first fetches, the others then find its results fresh and skip GitHub.
+    async def load(
+        self,
+        targets: List[Deployment],
+        fields: Iterable[DeploymentField],
+        force: bool = False,
+    ) -> None:
+        if not shared_cache.shared:
+            return await self._load(targets, fields)
+
+        fields = frozenset(fields)
+        [ids, names] = _flight_key(targets, fields)
+        async with shared_cache.lock(f"load:{','.join(ids)}:{','.join(names)}"):
+            await self.restore(targets)
+            if not force:
+                targets = [
+                    deployment
+                    for deployment in targets
+                    if self.is_stale([deployment], fields)
+                ]
+            if not targets:
+                return
+            try:
+                await self._load(targets, fields)
+            finally:
+                await self.save(targets)
+
+    async def _load(
+        self, targets: List[Deployment], fields: Iterable[DeploymentField]
+    ) -> None:
+        # Set as each source arrives, a failing source doesn't discard the others
+        def on_values(values: Values) -> None:
+            for deployment_id, fields in values.items():
+                if fields:
+                    self.set(deployment_id, **fields)
+
+        result = await load(targets, fields, on_values)
+        if result.errors:
+            raise result.errors[0]
+
+    async def refresh_fields(
+        self, targets: List[Deployment], fields: Iterable[DeploymentField]
+    ) -> None:
+        with background():
+            await self.load(targets, fields, force=True)
+
+    # Deployments missing the same fields are fetched together, in one batch
+    def _groups(
+        self, targets: List[Deployment], fields: FrozenSet[DeploymentField]
+    ) -> Dict[FrozenSet[DeploymentField], List[Deployment]]:
+        groups: Dict[FrozenSet[DeploymentField], List[Deployment]] = {}
+        for deployment in targets:
+            if missing := self.missing(deployment.id, fields):
+                groups.setdefault(missing, []).append(deployment)
+        return groups
+
+    # Commands and prefetches share the upstream calls themselves (coalesced),
+    # so an overlapping batch doesn't hit GitHub twice
+    def _fetch(
+        self, targets: List[Deployment], fields: FrozenSet[DeploymentField]
+    ) -> asyncio.Task:
+        task = spawn(self._load_batch(targets, fields))
+        self._fetches.add(task)
+        task.add_done_callback(self._fetches.discard)
+        return task
+
+    async def _load_batch(
+        self, targets: List[Deployment], fields: FrozenSet[DeploymentField]
+    ) -> None:
+        # Upstream calls made for these deployments carry their ids in the trace
+        with span(
+            "fetch",
+            service=",".join(deployment.id for deployment in targets),
+            fields=",".join(sorted(fields)),
+        ):
+            await self.load(targets, fields)
+
+    # Fetch the fields incomplete deployments are missing, one batch per set of
+    # missing fields, yielding each deployment as soon as its values arrive.
+    # Whatever is still missing at the deadline is reported as timed out and
+    # left to complete in the background for the next command.
+    async def fill(
+        self,
+        timeout: float,
+        targets: List[Deployment] | None = None,
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> AsyncIterator[Tuple[str, Exception | None]]:
+        groups = self._groups(self.registry if targets is None else targets, fields)
+        tasks = {
+            self._fetch(group, missing): group for missing, group in groups.items()
+        }
+        waiting = {
+            deployment.id: None for group in groups.values() for deployment in group
+        }
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = set(tasks)
+        while True:
+            for deployment_id in list(waiting):
+                if self.is_complete(deployment_id, fields):
+                    del waiting[deployment_id]
+                    yield (deployment_id, None)
+            # The batch is over, its deployments have all they'll get
+            for task in [task for task in pending if task.done()]:
+                pending.discard(task)
+                for deployment in tasks[task]:
+                    if deployment.id in waiting:
+                        del waiting[deployment.id]
+                        yield (deployment.id, task.exception())
+
+            remaining = deadline - loop.time()
+            if not waiting or remaining <= 0:
+                break
+            updated = asyncio.create_task(self._updated.wait())
+            try:
+                await asyncio.wait(
+                    [*pending, updated],
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                updated.cancel()
+
+        for deployment_id in waiting:
+            yield (deployment_id, TimeoutError(f"No response within {timeout:g}s"))
+
+    def prefetch(
+        self,
+        targets: List[Deployment],
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> None:
+        with background():
+            for missing, group in self._groups(targets, fields).items():
+                self._fetch(group, missing).add_done_callback(self._log_prefetch)
+
+    def _log_prefetch(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Error prefetching deployment: {task.exception()}")
+
+    @coalesce
+    async def refresh(self) -> None:
+        await self.load(self.registry, ALL_FIELDS)
+        logging.info(f"Deployment state refreshed (version {self.version})")
+
+    async def _safe_refresh(
+        self,
+        targets: List[Deployment] | None = None,
+        fields: FrozenSet[DeploymentField] = ALL_FIELDS,
+    ) -> None:
+        try:
+            if targets is None:
+                await self.refresh()
+            else:
+                await self.load(targets, fields)
+        except Exception as e:
+            logging.error(f"Error refreshing deployment state: {e}")
+
+    async def _refresh_loop(self) -> None:
+        # Start from what a previous run (or another worker) left behind
+        try:
+            await self.restore()
+        except Exception as e:
+            logging.error(f"Error restoring deployment state: {e}")
+        while True:
+            with background():
+                await self._safe_refresh()
+            await asyncio.sleep(REFRESH_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "fetches": len(self._fetches),
+            "revalidations": len(self._revalidations),
+        }
+
+    async def stop(self) -> None:
+        for task in (
+            self._task,
+            *self._revalidations.values(),
+            *self._fetches,
+        ):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+deployment_store = DeploymentStore(deployments)
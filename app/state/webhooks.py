@@ -0,0 +1,123 @@
+import datetime
+import hashlib
+import hmac
+import logging
+
+from app import GITHUB_WEBHOOK_SECRET
+from app.git import cluster_mirror
+from app.models import VERSION_FIELDS, DeploymentField, LatestCommit
+from app.state.store import deployment_store
+
+
+def verify_signature(body: bytes, signature: str | None) -> bool:
+    if not GITHUB_WEBHOOK_SECRET or not signature:
+        return False
+    expected = hmac.new(
+        GITHUB_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+
+# Webhook timestamps carry an offset, the rest of the app expects UTC "Z" dates
+def _utc(timestamp: str) -> str:
+    date = datetime.datetime.fromisoformat(timestamp)
+    return date.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+async def handle_push(payload: dict) -> None:
+    if payload.get("deleted") or not payload.get("head_commit"):
+        return
+
+    full_name = payload["repository"]["full_name"].lower()
+    branch = payload["ref"].removeprefix("refs/heads/")
+
+    # Push to a service repository: the new head is in the payload
+    pushed = []
+    for deployment in deployment_store.registry:
+        repo = deployment.repository
+        if str(repo).lower() == full_name and repo.branch == branch:
+            deployment_store.set(
+                deployment.id,
+                latest_commit=LatestCommit(
+                    commit=payload["after"],
+                    date=_utc(payload["head_commit"]["timestamp"]),
+                ),
+            )
+            pushed.append(deployment)
+    if pushed:
+        await deployment_store.save(pushed)
+
+    # Push to the cluster repository: re-read only the touched kustomizations
+    touched = set()
+    for commit in payload.get("commits", []):
+        touched.update(commit.get("added", []))
+        touched.update(commit.get("modified", []))
+
+    targets = [
+        deployment
+        for deployment in deployment_store.registry
+        if str(deployment.deployments.repository).lower() == full_name
+        and deployment.deployments.repository.branch == branch
+        and touched
+        & {
+            deployment.deployments.development_path(),
+            deployment.deployments.production_path(),
+        }
+    ]
+    if targets:
+        if cluster_mirror.enabled:
+            await cluster_mirror.sync()
+        await deployment_store.refresh_fields(targets, VERSION_FIELDS)
+
+
+async def handle_package(payload: dict) -> None:
+    package = payload.get("registry_package") or payload.get("package") or {}
+    name = (package.get("name") or "").lower()
+
+    targets = [
+        deployment
+        for deployment in deployment_store.registry
+        if deployment.package.image == name
+    ]
+    if targets:
+        await deployment_store.refresh_fields(targets, {DeploymentField.LATEST_IMAGE})
+
+
+async def handle_workflow_run(payload: dict) -> None:
+    workflow_run = payload.get("workflow_run") or {}
+    if (
+        payload.get("action") != "completed"
+        or workflow_run.get("conclusion") != "success"
+    ):
+        return
+
+    full_name = payload["repository"]["full_name"].lower()
+    targets = [
+        deployment
+        for deployment in deployment_store.registry
+        if str(deployment.repository).lower() == full_name
+    ]
+    if targets:
+        await deployment_store.refresh_fields(
+            targets, {DeploymentField.LATEST_IMAGE, *VERSION_FIELDS}
+        )
+
+
+handlers = {
+    "push": handle_push,
+    "package": handle_package,
+    "registry_package": handle_package,
+    "workflow_run": handle_workflow_run,
+}
+
+
+async def handle_event(event: str, payload: dict) -> None:
+    handler = handlers.get(event)
+    if handler is None:
+        return
+
+    try:
+        await handler(payload)
+        logging.info(f"Handled `{event}` webhook")
+    except Exception as e:
+        logging.error(f"Error handling `{event}` webhook: {e}")
@@ -1,2 +1,10 @@
 from .database import *
 from .fromat_date import *
+from .idempotency import *
+from .loop_monitor import *
+from .metrics import *
+from .pool import *
+from .priority import *
+from .singleflight import *
+from .startup import *
+from .tracing import *
@@ -1,32 +1,132 @@
+import asyncio
+import csv
 import datetime
+import gzip
+import io
 import logging
-
-import pandas as pd
-import psycopg2
+from enum import StrEnum
+from typing import Any, Dict, List
 
 from app import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_COPY_BUFFER,
+    EXPORT_GZIP_LEVEL,
     PAYMENT_SERVICE_DB,
     POSTGRES_HOST,
-    POSTGRES_PASSWORD,
-    POSTGRES_PORT,
-    POSTGRES_USERNAME,
     USER_SERVICE_DB,
 )
-
-
-async def get_students():
-    with psycopg2.connect(
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        user=POSTGRES_USERNAME,
-        password=POSTGRES_PASSWORD,
-        database=USER_SERVICE_DB,
-    ) as conn:
-        query = "SELECT u.public_id, s.firstname, s.lastname, u.email, s.contactnumber, s.gender, s.city, s.country, u.userrole, u.created_at FROM users u LEFT JOIN students s ON u.public_id = s.userid WHERE u.userrole = 'student';"
-        students = pd.read_sql_query(query, conn, dtype=str)
-        logging.info(f"`students` retrieved with {len(students)} rows.")
-
-        students.columns = [
+from app.utils.metrics import instrument
+from app.utils.pool import get_pool
+from app.utils.tracing import tag
+
+# openpyxl is imported on first use: only /get needs it. Queries and the
+# exported files are produced on the database pool's threads, off the event
+# loop.
+
+
+def _cell(value: Any) -> str | None:
+    # Exported as text, like the values shown in the database
+    return None if value is None else str(value)
+
+
+class ExportFormat(StrEnum):
+    xlsx = "xlsx"
+    csv = "csv"
+    csv_gz = "csv.gz"
+
+
+def _file(table: str, format: ExportFormat) -> tuple:
+    file_name = f"{table}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    return (file_name, f"/tmp/{file_name}")
+
+
+# Rows go from a server-side cursor to a write-only workbook EXPORT_CHUNK_SIZE
+# at a time, so memory stays flat however large the table is.
+def _export_xlsx(connection, table: str, query: str, columns: List[str]) -> tuple:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+
+    rows = 0
+    with connection.cursor(name=f"export_{table}") as cursor:
+        cursor.itersize = EXPORT_CHUNK_SIZE
+        cursor.execute(query)
+        while chunk := cursor.fetchmany(EXPORT_CHUNK_SIZE):
+            for row in chunk:
+                sheet.append([_cell(value) for value in row])
+            rows += len(chunk)
+    logging.info(f"`{table}` retrieved with {rows} rows.")
+
+    file_name, file_path = _file(table, ExportFormat.xlsx)
+    workbook.save(file_path)
+    logging.info(f"Data from `{table}` table saved to {file_path}")
+
+    return (file_name, file_path)
+
+
+# PostgreSQL formats the CSV itself (COPY ... TO STDOUT) and it's written to
+# the file as it streams in, without building rows in Python.
+def _export_csv(
+    connection, table: str, query: str, columns: List[str], compressed: bool
+) -> tuple:
+    format = ExportFormat.csv_gz if compressed else ExportFormat.csv
+    file_name, file_path = _file(table, format)
+
+    header = io.StringIO()
+    # Same line endings as COPY
+    csv.writer(header, lineterminator="\n").writerow(columns)
+    copy = f"COPY ({query.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv)"
+    with (
+        gzip.open(file_path, "wb", compresslevel=EXPORT_GZIP_LEVEL)
+        if compressed
+        else open(file_path, "wb")
+    ) as file:
+        file.write(header.getvalue().encode("utf-8"))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(copy, file, size=EXPORT_COPY_BUFFER)
+            rows = cursor.rowcount
+    logging.info(f"Data from `{table}` table ({rows} rows) saved to {file_path}")
+
+    return (file_name, file_path)
+
+
+def _export(
+    connection, table: str, query: str, columns: List[str], format: ExportFormat
+) -> tuple:
+    if format == ExportFormat.xlsx:
+        return _export_xlsx(connection, table, query, columns)
+    return _export_csv(
+        connection, table, query, columns, compressed=format == ExportFormat.csv_gz
+    )
+
+
+# Whether each database answers, for /health
+async def ping_databases() -> Dict[str, bool]:
+    databases = (USER_SERVICE_DB, PAYMENT_SERVICE_DB)
+    results = await asyncio.gather(
+        *[get_pool(database).ping() for database in databases]
+    )
+    return dict(zip(databases, results))
+
+
+@instrument
+async def get_students(format: ExportFormat = ExportFormat.xlsx):
+    tag(database=USER_SERVICE_DB, host=POSTGRES_HOST, format=format)
+    query = "SELECT u.public_id, s.firstname, s.lastname, u.email, s.contactnumber, s.gender, s.city, s.country, u.userrole, u.created_at FROM users u LEFT JOIN students s ON u.public_id = s.userid WHERE u.userrole = 'student';"
+    return await get_pool(USER_SERVICE_DB).run(
+        _export,
+        "students",
+        query,
+        [
             "ID",
             "First Name",
             "Last Name",
@@ -37,29 +137,20 @@ async def get_students():
             "Country",
             "Role",
             "Created At",
-        ]
-
-        file_name = f"students_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-        file_path = f"/tmp/{file_name}"
-        students.to_excel(file_path, index=False)
-        logging.info(f"Data from `students` table saved to {file_path}")
-
-        return (file_name, file_path)
-
-
-async def get_recruiters():
-    with psycopg2.connect(
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        user=POSTGRES_USERNAME,
-        password=POSTGRES_PASSWORD,
-        database=USER_SERVICE_DB,
-    ) as conn:
-        query = "SELECT u.public_id, r.first_name, r.last_name, u.email, r.contact_number, r.company_name, r.company_location, u.userrole, u.created_at FROM users u LEFT JOIN recruiter_profiles r ON u.public_id = r.user_id WHERE u.userrole = 'recruiter';"
-        recruiters = pd.read_sql_query(query, conn, dtype=str)
-        logging.info(f"`recruiters` retrieved with {len(recruiters)} rows.")
-
-        recruiters.columns = [
+        ],
+        format,
+    )
+
+
+@instrument
+async def get_recruiters(format: ExportFormat = ExportFormat.xlsx):
+    tag(database=USER_SERVICE_DB, host=POSTGRES_HOST, format=format)
+    query = "SELECT u.public_id, r.first_name, r.last_name, u.email, r.contact_number, r.company_name, r.company_location, u.userrole, u.created_at FROM users u LEFT JOIN recruiter_profiles r ON u.public_id = r.user_id WHERE u.userrole = 'recruiter';"
+    return await get_pool(USER_SERVICE_DB).run(
+        _export,
+        "recruiters",
+        query,
+        [
             "ID",
             "First Name",
             "Last Name",
@@ -69,31 +160,20 @@ async def get_recruiters():
             "Company Location",
             "Role",
             "Created At",
-        ]
-
-        file_name = (
-            f"recruiters_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-        )
-        file_path = f"/tmp/{file_name}"
-        recruiters.to_excel(file_path, index=False)
-        logging.info(f"Data from `recruiters` table saved to {file_path}")
-
-        return (file_name, file_path)
-
-
-async def get_payments():
-    with psycopg2.connect(
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        user=POSTGRES_USERNAME,
-        password=POSTGRES_PASSWORD,
-        database=PAYMENT_SERVICE_DB,
-    ) as conn:
-        query = "SELECT user_id, customer_email, amount_total, currency, payment_method_types, timestamp, session_id FROM payments;"
-        payments = pd.read_sql_query(query, conn, dtype=str)
-        logging.info(f"`payments` retrieved with {len(payments)} rows.")
-
-        payments.columns = [
+        ],
+        format,
+    )
+
+
+@instrument
+async def get_payments(format: ExportFormat = ExportFormat.xlsx):
+    tag(database=PAYMENT_SERVICE_DB, host=POSTGRES_HOST, format=format)
+    query = "SELECT user_id, customer_email, amount_total, currency, payment_method_types, timestamp, session_id FROM payments;"
+    return await get_pool(PAYMENT_SERVICE_DB).run(
+        _export,
+        "payments",
+        query,
+        [
             "User ID",
             "Email",
             "Amount",
@@ -101,11 +181,6 @@ async def get_payments():
             "Payment Method",
             "Timestamp",
             "Session ID",
-        ]
-
-        file_name = f"payments_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-        file_path = f"/tmp/{file_name}"
-        payments.to_excel(file_path, index=False)
-        logging.info(f"Data from `payments` table saved to {file_path}")
-
-        return (file_name, file_path)
+        ],
+        format,
+    )
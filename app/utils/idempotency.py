@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+from app import IDEMPOTENCY_SIZE, IDEMPOTENCY_TTL
+
+
+class SuppressionStats:
+    __slots__ = ("claimed", "suppressed")
+
+    def __init__(self):
+        self.claimed = 0
+        self.suppressed = 0
+
+    def to_dict(self) -> dict:
+        return {"claimed": self.claimed, "suppressed": self.suppressed}
+
+
+# Bounded set of recently seen keys, each remembered for a TTL. The first
+# claim of a key wins, later claims within the TTL are duplicates.
+class IdempotencyStore:
+    def __init__(self, max_size: int = IDEMPOTENCY_SIZE, ttl: float = IDEMPOTENCY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._keys: OrderedDict[Tuple[str, Hashable], float] = OrderedDict()
+        self._stats: Dict[str, SuppressionStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def claim(self, kind: str, key: Hashable, ttl: float | None = None) -> bool:
+        now = time.monotonic()
+        stats = self._stats.setdefault(kind, SuppressionStats())
+
+        expires_at = self._keys.get((kind, key))
+        if expires_at is not None and expires_at > now:
+            stats.suppressed += 1
+            return False
+
+        self._keys[(kind, key)] = now + (self.ttl if ttl is None else ttl)
+        self._keys.move_to_end((kind, key))
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        stats.claimed += 1
+        return True
+
+    # Forget a key whose work failed, so a retry isn't suppressed
+    def release(self, kind: str, key: Hashable) -> None:
+        self._keys.pop((kind, key), None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._keys),
+            "kinds": {kind: stats.to_dict() for kind, stats in self._stats.items()},
+        }
+
+
+idempotency = IdempotencyStore()
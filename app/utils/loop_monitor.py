@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List
+
+from app import (
+    LOOP_BLOCK_THRESHOLD,
+    LOOP_LAG_INTERVAL,
+    LOOP_LAG_WINDOW,
+    LOOP_MONITOR,
+    LOOP_MONITOR_STRICT,
+)
+
+# Recent stalls kept for inspection
+MAX_BLOCKS = 20
+
+
+class LoopBlockedError(RuntimeError):
+    pass
+
+
+class Block:
+    __slots__ = ("started", "resumed", "duration", "task", "stack")
+
+    def __init__(self, started: float, task: str | None, stack: str):
+        self.started = started
+        # Filled in once the loop runs again
+        self.resumed: float | None = None
+        self.duration: float | None = None
+        self.task = task
+        self.stack = stack
+
+    @property
+    def elapsed(self) -> float:
+        if self.duration is not None:
+            return self.duration
+        return time.monotonic() - self.started
+
+    def to_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "duration": self.duration,
+            "task": self.task,
+            "stack": self.stack,
+        }
+
+
+# A heartbeat task measures how late the loop wakes it up (scheduling delay),
+# a watchdog thread notices when it hasn't beaten for LOOP_BLOCK_THRESHOLD and
+# captures what the loop thread is running at that moment.
+class LoopMonitor:
+    def __init__(self):
+        self.blocked = 0
+        self.samples: Deque[float] = deque(maxlen=LOOP_LAG_WINDOW)
+        self.blocks: Deque[Block] = deque(maxlen=MAX_BLOCKS)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread_id: int | None = None
+        self._last_beat = time.monotonic()
+        self._current: Block | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # The watchdog thread and the loop both touch samples, blocks and
+        # _current; readers copy under it rather than iterate a live deque
+        self._lock = threading.Lock()
+
+    def _beat(self, lag: float) -> None:
+        with self._lock:
+            self.samples.append(lag)
+            self._last_beat = time.monotonic()
+            block = self._current
+            if block is not None:
+                block.resumed = self._last_beat
+                block.duration = lag
+                self._current = None
+        if block is not None:
+            logging.warning(
+                f"Event loop was blocked for {block.duration * 1000:.0f}ms"
+                f" (task {block.task})"
+            )
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self._beat(max(0.0, time.monotonic() - expected))
+
+    def _capture(self) -> None:
+        last_beat = self._last_beat
+        frame = sys._current_frames().get(self._thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        block = Block(
+            last_beat + LOOP_LAG_INTERVAL,
+            task.get_name() if task else None,
+            stack,
+        )
+        with self._lock:
+            # The loop may have resumed while the stack was captured
+            if self._current is not None or self._last_beat != last_beat:
+                return
+            self._current = block
+            self.blocks.append(block)
+            self.blocked += 1
+        logging.warning(
+            f"Event loop blocked for over {LOOP_BLOCK_THRESHOLD * 1000:.0f}ms"
+            f" (task {block.task}):\n{stack}"
+        )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(LOOP_BLOCK_THRESHOLD / 2):
+            overdue = time.monotonic() - self._last_beat - LOOP_LAG_INTERVAL
+            # Once per stall, while it's still happening
+            if overdue > LOOP_BLOCK_THRESHOLD and self._current is None:
+                self._capture()
+
+    def start(self) -> None:
+        if not LOOP_MONITOR or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    def percentiles(self, quantiles=(0.5, 0.9, 0.99)) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {}
+        return {
+            quantile: samples[min(int(quantile * len(samples)), len(samples) - 1)]
+            for quantile in quantiles
+        }
+
+    def max_lag(self) -> float:
+        with self._lock:
+            return max(self.samples, default=0.0)
+
+    # Stalls the loop came out of after `started` (time.monotonic()). Nothing
+    # else runs while the loop is blocked, so they happened since then.
+    def blocks_since(self, started: float) -> List[Block]:
+        with self._lock:
+            blocks = list(self.blocks)
+        return [
+            block
+            for block in blocks
+            if block.resumed is None or block.resumed >= started
+        ]
+
+    # In strict mode (tests, CI), a stall during a command fails it. Stalls are
+    # matched by time, so a concurrent command can be blamed too.
+    def check(self, name: str, blocks: List[Block]) -> None:
+        if blocks and LOOP_MONITOR_STRICT:
+            raise LoopBlockedError(
+                f"{name} blocked the event loop {len(blocks)} time(s):\n"
+                + blocks[0].stack
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            blocked = self.blocked
+            samples = list(self.samples)
+            blocks = list(self.blocks)
+        return {
+            "blocked": blocked,
+            "samples": len(samples),
+            "percentiles": self.percentiles(),
+            "max": max(samples, default=0.0),
+            "blocks": [block.to_dict() for block in blocks],
+        }
+
+
+loop_monitor = LoopMonitor()
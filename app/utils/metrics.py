@@ -0,0 +1,209 @@
+import bisect
+import functools
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from app.utils.tracing import traced
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# Minimal Prometheus text-format metrics. Label values must come from small
+# fixed sets (command, function, host), never from user input or URLs.
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Labels, Labels, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}"
+            )
+        return lines
+
+
+# Like Gauge, a counter can read its values at scrape time, from a total the
+# app already keeps.
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        collect: Callable[[], Dict[Labels, float]] | None = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        values = self.collect() if self.collect else self._values
+        return [("", self.labelnames, key, value) for key, value in values.items()]
+
+
+# Values are read at scrape time from a callback returning labels -> value, so
+# existing stats() don't have to be mirrored on every change.
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        collect: Callable[[], Dict[Labels, float]] | None = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        values = self.collect() if self.collect else self._values
+        return [("", self.labelnames, key, value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] = self._sums.get(key, 0) + value
+
+    def samples(self):
+        samples = []
+        names = (*self.labelnames, "le")
+        for key, counts in self._counts.items():
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                total += count
+                samples.append(("_bucket", names, (*key, _format_value(bound)), total))
+            samples.append(("_sum", self.labelnames, key, self._sums[key]))
+            samples.append(("_count", self.labelnames, key, total))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+command_duration = Histogram(
+    "slack_command_duration_seconds",
+    "Time to handle a Slack slash command",
+    ("command",),
+)
+command_errors = Counter(
+    "slack_command_errors_total",
+    "Slack slash commands that failed, whether they raised or answered with an error",
+    ("command",),
+)
+upstream_duration = Histogram(
+    "upstream_call_duration_seconds",
+    "Time spent in upstream (GitHub, GHCR, git, database) calls",
+    ("function",),
+)
+upstream_errors = Counter(
+    "upstream_call_errors_total",
+    "Upstream calls that raised",
+    ("function",),
+)
+
+
+def timed(
+    histogram: Histogram, errors: Counter | None = None, **labels: Any
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+
+        return wrapper
+
+    return decorator
+
+
+# Upstream calls are labelled "<module>.<function>", e.g. "cluster.get_deployment_tag",
+# and recorded as a span of the command's trace under the same name
+def instrument(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    function = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+    return timed(upstream_duration, upstream_errors, function=function)(
+        traced(function)(fn)
+    )
+
+
+def timed_command(command: str):
+    return timed(command_duration, command_errors, command=command)
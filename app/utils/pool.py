@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+from app import (
+    DB_CONNECT_TIMEOUT,
+    DB_HEALTH_CHECK_INTERVAL,
+    DB_POOL_SIZE,
+    DB_STATEMENT_TIMEOUT,
+    POSTGRES_HOST,
+    POSTGRES_PASSWORD,
+    POSTGRES_PORT,
+    POSTGRES_USERNAME,
+)
+
+T = TypeVar("T")
+
+
+class PoolStats:
+    __slots__ = ("connected", "discarded", "checks", "queries")
+
+    def __init__(self):
+        self.connected = 0
+        self.discarded = 0
+        self.checks = 0
+        self.queries = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "connected": self.connected,
+            "discarded": self.discarded,
+            "checks": self.checks,
+            "queries": self.queries,
+        }
+
+
+# psycopg2 connections for one database, used only from the pool's own worker
+# threads so queries never block the event loop. Each worker holds at most one
+# connection, so there are never more than `size` of them. Connections idle
+# for over DB_HEALTH_CHECK_INTERVAL are pinged before reuse, and every
+# statement is cut off server-side after DB_STATEMENT_TIMEOUT.
+class DatabasePool:
+    def __init__(self, database: str, size: int = DB_POOL_SIZE):
+        self.database = database
+        self.size = size
+        self.stats = PoolStats()
+        self.in_use = 0
+
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix=f"db-{database}"
+        )
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _connect(self):
+        # Imported on first use, like the rest of the database code
+        import psycopg2
+
+        connection = psycopg2.connect(
+            host=POSTGRES_HOST,
+            port=POSTGRES_PORT,
+            user=POSTGRES_USERNAME,
+            password=POSTGRES_PASSWORD,
+            database=self.database,
+            connect_timeout=DB_CONNECT_TIMEOUT,
+            application_name="slack-bot",
+            options=f"-c statement_timeout={int(DB_STATEMENT_TIMEOUT * 1000)}",
+        )
+        self.stats.connected += 1
+        return connection
+
+    def _is_healthy(self, connection, idle_since: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < DB_HEALTH_CHECK_INTERVAL:
+            return True
+        self.stats.checks += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Dropping stale connection to {self.database}: {e}")
+            return False
+
+    def _discard(self, connection) -> None:
+        self.stats.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, idle_since = self._idle.pop()
+            if self._is_healthy(connection, idle_since):
+                return connection
+            self._discard(connection)
+        return self._connect()
+
+    def _release(self, connection, broken: bool) -> None:
+        if broken or connection.closed:
+            self._discard(connection)
+            return
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        import psycopg2
+
+        connection = self._acquire()
+        with self._lock:
+            self.in_use += 1
+        broken = False
+        try:
+            # Commits on success, rolls back on error
+            with connection:
+                return fn(connection, *args)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            with self._lock:
+                self.stats.queries += 1
+                self.in_use -= 1
+            self._release(connection, broken)
+
+    # Runs fn(connection, *args) on one of the pool's threads
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(self._run, fn, *args)
+        )
+
+    async def ping(self) -> bool:
+        def select_one(connection) -> bool:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                return cursor.fetchone() == (1,)
+
+        try:
+            return await self.run(select_one)
+        except Exception as e:
+            logging.warning(f"Database {self.database} is unavailable: {e}")
+            return False
+
+    def _close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, DatabasePool] = {}
+
+
+def get_pool(database: str) -> DatabasePool:
+    if database not in _pools:
+        _pools[database] = DatabasePool(database)
+    return _pools[database]
+
+
+def pools() -> Dict[str, DatabasePool]:
+    return dict(_pools)
+
+
+async def close_pools() -> None:
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
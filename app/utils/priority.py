@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Coroutine
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+# Mutable, so shared work can be promoted after it started. A flight's
+# priority follows its creator's unless it was promoted itself, so promoting
+# an outer flight also promotes the flights it started.
+class Priority:
+    __slots__ = ("_level", "parent")
+
+    def __init__(self, level: int, parent: "Priority | None" = None):
+        self._level = level
+        self.parent = parent
+
+    @property
+    def level(self) -> int:
+        if self._level == INTERACTIVE or self.parent is None:
+            return self._level
+        return self.parent.level
+
+    def promote(self) -> None:
+        self._level = INTERACTIVE
+
+
+_priority: ContextVar[Priority | None] = ContextVar("priority", default=None)
+
+_flights: "weakref.WeakKeyDictionary[asyncio.Future, Priority]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def current_priority() -> int:
+    priority = _priority.get()
+    return INTERACTIVE if priority is None else priority.level
+
+
+# Requests made inside this block yield to interactive (Slack command) traffic
+# and leave GITHUB_RATE_LIMIT_RESERVE of the budget untouched.
+@contextmanager
+def background():
+    token = _priority.set(Priority(BACKGROUND))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Starts work other callers can join (coalesced calls, per-deployment fetches)
+# with its own priority, so joining it can promote it without touching the
+# creator's context.
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    parent = _priority.get()
+    priority = Priority(current_priority(), parent)
+    context = contextvars.copy_context()
+    context.run(_priority.set, priority)
+    task = asyncio.get_running_loop().create_task(coro, context=context)
+    _flights[task] = priority
+    return task
+
+
+# An interactive caller waiting on background work makes it interactive, so
+# it isn't held back by the rate limit reserve meant for background refreshes.
+def join(task: asyncio.Future) -> None:
+    if current_priority() != INTERACTIVE:
+        return
+    priority = _flights.get(task)
+    if priority is not None:
+        priority.promote()
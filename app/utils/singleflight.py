@@ -0,0 +1,110 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.utils.priority import join, spawn
+
+
+class FlightStats:
+    __slots__ = ("calls", "executions", "deduplicated", "in_flight")
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+        self.in_flight = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
+
+
+# Concurrent calls with the same key share a single in-flight task instead of
+# each doing the same upstream work. Nothing is kept once the task completes.
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[Hashable, FlightStats] = {}
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        self._stats[key].in_flight = 0
+        # Retrieve the exception so an unawaited failure isn't logged as lost
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self._stats.setdefault(key, FlightStats())
+        stats.calls += 1
+
+        task = self._calls.get(key)
+        if task is None:
+            stats.executions += 1
+            stats.in_flight = 1
+            task = spawn(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._done, key))
+        else:
+            stats.deduplicated += 1
+            join(task)
+
+        # Shielded, so one caller giving up doesn't cancel the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {str(key): stats.to_dict() for key, stats in self._stats.items()}
+
+    # Summed over every key
+    def totals(self) -> dict:
+        totals = FlightStats()
+        for stats in self._stats.values():
+            for field in FlightStats.__slots__:
+                setattr(totals, field, getattr(totals, field) + getattr(stats, field))
+        return totals.to_dict()
+
+
+flights = SingleFlight()
+
+
+def _hashable(value: Any) -> Hashable:
+    # Models are frozen, so they hash by their fields; lists become tuples
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return frozenset((key, _hashable(item)) for key, item in value.items())
+    hash(value)
+    return value
+
+
+def _call_key(
+    name: str, signature: inspect.Signature, args: tuple, kwargs: dict
+) -> Hashable:
+    # Bound to parameter names, so positional, keyword and defaulted arguments
+    # for the same call give the same key
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (
+        name,
+        tuple((key, _hashable(value)) for key, value in bound.arguments.items()),
+    )
+
+
+def coalesce(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await flights.do(
+            _call_key(name, signature, args, kwargs), lambda: fn(*args, **kwargs)
+        )
+
+    return wrapper
@@ -0,0 +1,46 @@
+import logging
+import sys
+import time
+from typing import Dict
+
+from app import IMPORT_TIME_BUDGET, STARTED_AT, STARTUP_STRICT
+
+# Only needed by /get, they must not be imported at startup
+HEAVY_MODULES = ("psycopg2", "openpyxl")
+
+_marks: Dict[str, float] = {}
+
+
+def mark(name: str) -> float:
+    _marks[name] = time.perf_counter() - STARTED_AT
+    return _marks[name]
+
+
+def startup_timings() -> Dict[str, float]:
+    return dict(_marks)
+
+
+# Logs the boot timings and checks them against the import budget. With
+# STARTUP_STRICT (CI), a regression fails the boot instead of only warning.
+def report_startup() -> None:
+    logging.info(
+        "Startup timings: "
+        + ", ".join(
+            f"{name} {elapsed * 1000:.0f}ms" for name, elapsed in _marks.items()
+        )
+    )
+
+    problems = []
+    imports = _marks.get("imports")
+    if imports is not None and imports > IMPORT_TIME_BUDGET:
+        problems.append(
+            f"importing app.main took {imports:.2f}s (budget {IMPORT_TIME_BUDGET:g}s)"
+        )
+    preloaded = [module for module in HEAVY_MODULES if module in sys.modules]
+    if preloaded:
+        problems.append(f"heavy modules imported at startup: {preloaded}")
+
+    for problem in problems:
+        logging.warning(f"Startup budget exceeded: {problem}")
+    if problems and STARTUP_STRICT:
+        raise RuntimeError(f"Startup budget exceeded: {'; '.join(problems)}")
@@ -0,0 +1,320 @@
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List
+
+from app import TRACE_BUFFER_SIZE, TRACE_MAX_BYTES, TRACE_PATH
+from app.utils.loop_monitor import loop_monitor
+
+# Spans past this are dropped, so a runaway fan-out can't grow a trace forever
+MAX_SPANS = 500
+
+WATERFALL_WIDTH = 24
+WATERFALL_LABEL = 36
+WATERFALL_MAX_SPANS = 60
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "attributes",
+        "depth",
+        "start",
+        "end",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        attributes: Dict[str, Any],
+        parent: "Span | None" = None,
+    ):
+        self.trace = trace
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attributes = attributes
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.error: str | None = None
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "start_ms": round((self.start - self.trace.root.start) * 1000, 3),
+            "duration_ms": (
+                None if self.duration is None else round(self.duration * 1000, 3)
+            ),
+            "error": self.error,
+        }
+
+
+# One per Slack command. Spans opened by the command's tasks (including the
+# ones it spawns, which copy its context) are recorded under its root span.
+class Trace:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = secrets.token_hex(8)
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root = Span(self, name, attributes)
+        self.spans.append(self.root)
+
+    @property
+    def finished(self) -> bool:
+        return self.root.end is not None
+
+    def add(self, name: str, attributes: Dict[str, Any], parent: Span) -> Span | None:
+        if self.finished or len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = Span(self, name, attributes, parent)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "dropped": self.dropped,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+traces: Deque[Trace] = deque(maxlen=TRACE_BUFFER_SIZE)
+
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+# Appends traces to a JSON lines file from its own thread, so commands never
+# wait on the disk. If the writer falls TRACE_BUFFER_SIZE traces behind, new
+# ones are dropped instead of queueing up.
+class TraceFile:
+    def __init__(self, path: str, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+
+        self._queue: queue.Queue[dict | None] = queue.Queue(maxsize=TRACE_BUFFER_SIZE)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def write(self, trace: Trace) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="trace-file", daemon=True
+                )
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _append(self, record: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            size = file.tell()
+        if size > self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+
+    def _run(self) -> None:
+        while (record := self._queue.get()) is not None:
+            try:
+                self._append(record)
+            except OSError as e:
+                logging.warning(f"Error exporting trace {record['trace_id']}: {e}")
+
+    # Writes what's queued, then stops the thread
+    async def close(self, timeout: float = 5) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        await asyncio.to_thread(self._queue.put, None)
+        await asyncio.to_thread(thread.join, timeout)
+
+
+trace_file = TraceFile(TRACE_PATH) if TRACE_PATH else None
+
+
+async def close_trace_file() -> None:
+    if trace_file is not None:
+        await trace_file.close()
+
+
+def _export(trace: Trace) -> None:
+    traces.append(trace)
+    if trace_file is not None:
+        trace_file.write(trace)
+
+
+@contextmanager
+def _run(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}".splitlines()[0]
+        raise
+    finally:
+        span.end = time.perf_counter()
+        _current.reset(token)
+
+
+# A child of the current span. Outside of a traced command this does nothing.
+# The service id is inherited from the parent unless given.
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    if "service" in parent.attributes:
+        attributes.setdefault("service", parent.attributes["service"])
+    child = parent.trace.add(name, attributes, parent)
+    if child is None:
+        yield None
+        return
+    with _run(child):
+        yield child
+
+
+# Adds attributes to the current span, e.g. the status of a response
+def tag(**attributes: Any) -> None:
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def _describe(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if "command" in kwargs:
+        return {"text": kwargs["command"].get("text", "")}
+    if "action" in kwargs:
+        return {"action": kwargs["action"].get("action_id")}
+    return {}
+
+
+# Makes a Slack command (or action) handler the root span of a new trace. The
+# time the event loop spent blocked meanwhile is recorded on the root span.
+def trace_command(command: str):
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            trace = Trace(command, _describe(kwargs))
+            started = time.monotonic()
+            try:
+                with _run(trace.root):
+                    result = await fn(*args, **kwargs)
+                    if blocks := loop_monitor.blocks_since(started):
+                        trace.root.attributes["loop_blocked_ms"] = round(
+                            sum(block.elapsed for block in blocks) * 1000
+                        )
+                        loop_monitor.check(command, blocks)
+                    return result
+            finally:
+                _export(trace)
+
+        return wrapper
+
+    return decorator
+
+
+def traced(name: str):
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def last_trace() -> Trace | None:
+    return traces[-1] if traces else None
+
+
+def _bar(span: Span, origin: float, total: float) -> str:
+    end = span.end if span.end is not None else time.perf_counter()
+    scale = WATERFALL_WIDTH / total if total > 0 else 0
+    left = min(int((span.start - origin) * scale), WATERFALL_WIDTH - 1)
+    right = max(left + 1, min(math.ceil((end - origin) * scale), WATERFALL_WIDTH))
+    return " " * left + "█" * (right - left) + " " * (WATERFALL_WIDTH - right)
+
+
+def _label(span: Span, parent: Span | None) -> str:
+    label = "  " * span.depth + span.name
+    # Only where it's set, children inherit it
+    service = span.attributes.get("service")
+    if service and (parent is None or parent.attributes.get("service") != service):
+        label += f" [{service}]"
+    if len(label) > WATERFALL_LABEL:
+        label = label[: WATERFALL_LABEL - 1] + "…"
+    return label.ljust(WATERFALL_LABEL)
+
+
+def _sorted(trace: Trace) -> List[Span]:
+    # Depth first, children in start order
+    children: Dict[str | None, List[Span]] = {}
+    for item in trace.spans:
+        children.setdefault(item.parent_id, []).append(item)
+
+    ordered = []
+    stack = [trace.root]
+    while stack:
+        item = stack.pop()
+        ordered.append(item)
+        stack.extend(
+            sorted(children.get(item.span_id, []), key=lambda s: s.start, reverse=True)
+        )
+    return ordered
+
+
+# Plain text waterfall: one row per span, its bar placed on the root's timeline
+def render_waterfall(trace: Trace) -> str:
+    root = trace.root
+    total = root.duration or 0
+    lines = []
+    spans = _sorted(trace)
+    by_id = {item.span_id: item for item in spans}
+    for item in spans[:WATERFALL_MAX_SPANS]:
+        duration = (
+            "running" if item.duration is None else f"{item.duration * 1000:.0f}ms"
+        )
+        marker = " !" if item.error else ""
+        lines.append(
+            f"{_label(item, by_id.get(item.parent_id))} |{_bar(item, root.start, total)}| {duration:>7}{marker}"
+        )
+    if len(spans) > WATERFALL_MAX_SPANS:
+        lines.append(f"… {len(spans) - WATERFALL_MAX_SPANS} more spans")
+    if trace.dropped:
+        lines.append(f"… {trace.dropped} spans dropped")
+    return "\n".join(lines)
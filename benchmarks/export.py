@@ -0,0 +1,152 @@
+# Client side of the /get exports on generated payments-like rows, one
+# process per format so peak RSS is the format's own. There's no database:
+# a fake connection serves the rows (named cursor, xlsx) or formats them as
+# CSV (COPY, which a real server does itself).
+#
+#   python benchmarks/export.py --rows 100000 300000
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLUMNS = [
+    "User ID",
+    "Email",
+    "Amount",
+    "Currency",
+    "Payment Method",
+    "Timestamp",
+    "Session ID",
+]
+
+
+def generate(rows: int):
+    timestamp = datetime.datetime(2024, 1, 1)
+    for i in range(rows):
+        yield (
+            f"user_{i:08d}",
+            f"user{i}@example.com",
+            1999 + i % 1000,
+            "usd",
+            "{card}",
+            timestamp + datetime.timedelta(seconds=i),
+            f"cs_test_{i:024d}",
+        )
+
+
+class FakeCursor:
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.rowcount = -1
+        self.itersize = 2000
+        self._rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query: str) -> None:
+        self._rows = generate(self.rows)
+
+    def fetchmany(self, size: int) -> list:
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def copy_expert(self, sql: str, file, size: int) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row in generate(self.rows):
+            writer.writerow(row)
+            if buffer.tell() >= size:
+                file.write(buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+        file.write(buffer.getvalue().encode("utf-8"))
+        self.rowcount = self.rows
+
+
+class FakeConnection:
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    def cursor(self, name: str | None = None) -> FakeCursor:
+        return FakeCursor(self.rows)
+
+
+def run(rows: int, format: str) -> dict:
+    from app.utils.database import ExportFormat, _export
+
+    query = "SELECT user_id, customer_email, amount_total, currency, payment_method_types, timestamp, session_id FROM payments;"
+    started = time.perf_counter()
+    _, file_path = _export(
+        FakeConnection(rows), "payments", query, COLUMNS, ExportFormat(format)
+    )
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(file_path)
+    os.remove(file_path)
+    return {
+        "seconds": elapsed,
+        "bytes": size,
+        # KiB on Linux
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def measure(rows: int, format: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--rows", str(rows), "--format", format],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--format", help="run a single format in this process")
+    args = parser.parse_args()
+
+    # app reads its settings at import time
+    for name in (
+        "BOT_TOKEN",
+        "SIGNING_SECRET",
+        "GITHUB_TOKEN",
+        "POSTGRES_USERNAME",
+        "POSTGRES_PASSWORD",
+        "POSTGRES_HOST",
+        "POSTGRES_PORT",
+    ):
+        os.environ.setdefault(name, "benchmark")
+
+    if args.format:
+        print(json.dumps(run(args.rows[0], args.format)))
+        return
+
+    formats = ("xlsx", "csv", "csv.gz")
+    print(f"{'rows':>9}  " + "  ".join(f"{f:>25}" for f in formats))
+    for rows in args.rows:
+        results = [measure(rows, format) for format in formats]
+        print(
+            f"{rows:>9,}  "
+            + "  ".join(
+                f"{r['seconds']:6.2f}s {r['bytes'] / 1e6:6.1f} MB"
+                f" {r['peak_rss'] / 1e6:5.0f} MB RSS"
+                for r in results
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import os
+
+# app reads its settings at import time
+for name, value in {
+    "BOT_TOKEN": "xoxb-test",
+    "SIGNING_SECRET": "test",
+    "GITHUB_TOKEN": "ghp_test",
+    "POSTGRES_USERNAME": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    # Traces stay in memory rather than in the checkout's .cache
+    "TRACE_PATH": "",
+}.items():
+    os.environ.setdefault(name, value)
+
+# app.main has to be imported before its submodules
+import app.main  # noqa: E402,F401
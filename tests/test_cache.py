@@ -0,0 +1,53 @@
+import asyncio
+import importlib
+
+import httpx
+
+cache = importlib.import_module("app.git.cache")
+
+ETAG = '"v1"'
+
+
+def client(requests: list, base_url: str = "https://api.github.com"):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == ETAG:
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"etag": ETAG}, json={"sha": "abc"})
+
+    return httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(handler))
+
+
+def get(client: httpx.AsyncClient, token: str = "one") -> httpx.Response:
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    return asyncio.run(cache.cached_get(client, "/repos/o/r/commits/main", headers))
+
+
+def test_not_modified_is_answered_from_the_cache(monkeypatch):
+    monkeypatch.setattr(cache, "http_cache", cache.HttpCache(10))
+    requests = []
+    github = client(requests)
+
+    first = get(github)
+    second = get(github)
+
+    assert "if-none-match" not in requests[0].headers
+    assert requests[1].headers["if-none-match"] == ETAG
+    assert second.status_code == 200
+    assert second.json() == first.json() == {"sha": "abc"}
+    assert second.headers["etag"] == ETAG
+    assert (cache.http_cache.hits, cache.http_cache.misses) == (1, 1)
+
+
+def test_entries_are_kept_per_host_and_token(monkeypatch):
+    monkeypatch.setattr(cache, "http_cache", cache.HttpCache(10))
+    requests = []
+
+    get(client(requests))
+    get(client(requests), token="two")
+    get(client(requests, base_url="https://github.example.com/api/v3"))
+
+    # Nothing was revalidated with an entry another token or host stored
+    assert all("if-none-match" not in request.headers for request in requests)
+    assert len(cache.http_cache) == 3
+    assert "one" not in repr(list(cache.http_cache._entries))
@@ -0,0 +1,77 @@
+import asyncio
+import importlib
+
+import httpx
+
+from app.deployments import deployments
+from app.models import DispatchStatus
+
+dev = importlib.import_module("app.events.dev")
+
+
+def button_body(message_ts: str, deployment_ids) -> dict:
+    return {
+        "state": {
+            "values": {
+                "block": {
+                    "deploy-dev": {
+                        "selected_options": [{"value": id} for id in deployment_ids]
+                    }
+                }
+            }
+        },
+        "container": {"channel_id": "C1", "message_ts": message_ts},
+    }
+
+
+def click(body: dict) -> list:
+    responses = []
+
+    async def ack():
+        pass
+
+    async def respond(*args, **kwargs):
+        responses.append(args[0] if args else kwargs["blocks"])
+
+    asyncio.run(dev.deploy_dev_button_action(body=body, ack=ack, respond=respond))
+    return responses
+
+
+def test_failed_dispatch_can_be_retried(monkeypatch):
+    dispatches = []
+
+    async def dispatch_workflow(repository, workflow):
+        dispatches.append(workflow)
+        if len(dispatches) == 1:
+            raise httpx.HTTPError("502 Bad Gateway")
+        return DispatchStatus.DISPATCHED
+
+    monkeypatch.setattr(dev, "dispatch_workflow", dispatch_workflow)
+    body = button_body("1700000000.000100", [deployments[0].id])
+
+    [failed] = click(body)
+    assert " ❌" in str(failed)
+
+    # Nothing was dispatched, so the same click goes through again
+    [retried] = click(body)
+    assert " ✅" in str(retried)
+    assert len(dispatches) == 2
+
+    # A dispatched request is deduplicated
+    assert click(body) == ["⏳ This deployment was already requested."]
+    assert len(dispatches) == 2
+
+
+def test_partial_failure_keeps_the_claim(monkeypatch):
+    async def dispatch_workflow(repository, workflow):
+        if repository == deployments[0].repository:
+            raise httpx.HTTPError("502 Bad Gateway")
+        return DispatchStatus.DISPATCHED
+
+    monkeypatch.setattr(dev, "dispatch_workflow", dispatch_workflow)
+    others = [d for d in deployments if d.repository != deployments[0].repository]
+    body = button_body("1700000000.000200", [deployments[0].id, others[0].id])
+
+    [response] = click(body)
+    assert " ❌" in str(response) and " ✅" in str(response)
+    assert click(body) == ["⏳ This deployment was already requested."]
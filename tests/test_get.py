@@ -0,0 +1,51 @@
+import asyncio
+import functools
+import importlib
+
+import httpx
+
+get = importlib.import_module("app.events.get")
+
+
+def test_upload_file_streams_to_external_upload(tmp_path, monkeypatch):
+    content = b"id,email\n" + b"1,user@example.com\n" * 1000
+    file_path = tmp_path / "payments.csv"
+    file_path.write_bytes(content)
+    monkeypatch.setattr(get, "UPLOAD_CHUNK_SIZE", 4096)
+
+    calls = {}
+
+    async def get_upload_url(**kwargs):
+        calls["get_upload_url"] = kwargs
+        return {"upload_url": "https://files.slack.test/upload/1", "file_id": "F1"}
+
+    async def complete_upload(**kwargs):
+        calls["complete_upload"] = kwargs
+        return {"ok": True}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["request"] = request
+        calls["body"] = b"".join([chunk async for chunk in request.stream])
+        return httpx.Response(200, text="OK - 1")
+
+    monkeypatch.setattr(get.app.client, "files_getUploadURLExternal", get_upload_url)
+    monkeypatch.setattr(get.app.client, "files_completeUploadExternal", complete_upload)
+    monkeypatch.setattr(
+        get.httpx,
+        "AsyncClient",
+        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)),
+    )
+
+    asyncio.run(get.upload_file("C1", "payments.csv", str(file_path), "Here it is"))
+
+    assert calls["get_upload_url"] == {
+        "filename": "payments.csv",
+        "length": len(content),
+    }
+    assert calls["request"].headers["Content-Length"] == str(len(content))
+    assert calls["body"] == content
+    assert calls["complete_upload"] == {
+        "files": [{"id": "F1", "title": "payments.csv"}],
+        "channel_id": "C1",
+        "initial_comment": "Here it is",
+    }
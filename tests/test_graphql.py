@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+
+from app.models import ClusterDeployment, DeploymentVersion, LatestCommit, Repository
+
+graphql = importlib.import_module("app.git.graphql")
+
+API = Repository(repo="api")
+WEB = Repository(repo="web", branch="develop")
+DEPLOYMENTS = [ClusterDeployment(servive="api"), ClusterDeployment(servive="web")]
+CLUSTER = DEPLOYMENTS[0].repository
+
+
+def kustomization(tag: str) -> str:
+    return f"images:\n  - name: api\n    newTag: {tag}\n"
+
+
+def response() -> dict:
+    [api, web] = DEPLOYMENTS
+    files = {
+        api.development_path(): "a1",
+        api.production_path(): "a0",
+        web.development_path(): "w1",
+        web.production_path(): "w0",
+    }
+    data = {
+        graphql._alias("r", graphql._key(repo)): {
+            "ref": {"target": {"oid": f"{repo.repo}-head", "committedDate": "2024"}}
+        }
+        for repo in (API, WEB)
+    }
+    data[graphql._alias("c", graphql._key(CLUSTER))] = {
+        **{
+            graphql._alias("f", path): {"text": kustomization(tag)}
+            for path, tag in files.items()
+        },
+        "ref": {
+            "target": {
+                graphql._alias("h", path): {
+                    "nodes": [{"oid": tag, "committedDate": f"date-{tag}"}]
+                }
+                for path, tag in files.items()
+            }
+        },
+    }
+    return data
+
+
+def without_mirrors(monkeypatch):
+    monkeypatch.setattr(graphql.cluster_mirror, "serves", lambda repo: False)
+    monkeypatch.setattr(graphql.cluster_history, "serves", lambda repo: False)
+
+
+def test_query_covers_each_repository_and_path_once(monkeypatch):
+    without_mirrors(monkeypatch)
+
+    query = graphql.build_query([API, WEB, API], DEPLOYMENTS)
+
+    assert query.count("repository(") == 3
+    assert query.count('qualifiedName: "develop"') == 1
+    for deployment in DEPLOYMENTS:
+        for path in (deployment.development_path(), deployment.production_path()):
+            assert query.count(f'history(first: 1, path: "{path}")') == 1
+    development = graphql.build_query([], DEPLOYMENTS, drop_production=True)
+    assert DEPLOYMENTS[0].production_path() not in development
+    assert graphql.build_query([], []) is None
+
+
+def test_response_is_mapped_back_to_each_entry(monkeypatch):
+    without_mirrors(monkeypatch)
+    queries = []
+
+    async def run_query(query):
+        queries.append(query)
+        return response()
+
+    monkeypatch.setattr(graphql, "run_query", run_query)
+
+    commits, versions = asyncio.run(
+        graphql.batch_latest_commits_and_deployments([WEB, API], DEPLOYMENTS)
+    )
+
+    assert len(queries) == 1
+    assert commits == [
+        LatestCommit(commit="web-head", date="2024"),
+        LatestCommit(commit="api-head", date="2024"),
+    ]
+    assert versions == [
+        DeploymentVersion(
+            development_version="a1",
+            development_date="date-a1",
+            production_version="a0",
+            production_date="date-a0",
+        ),
+        DeploymentVersion(
+            development_version="w1",
+            development_date="date-w1",
+            production_version="w0",
+            production_date="date-w0",
+        ),
+    ]
+
+
+def test_failed_batch_falls_back_to_rest(monkeypatch):
+    without_mirrors(monkeypatch)
+    monkeypatch.setattr(graphql, "GITHUB_GRAPHQL", True)
+
+    async def run_query(query):
+        raise ValueError("GraphQL errors: [...]")
+
+    async def get_latest_commit(repo):
+        return LatestCommit(commit=f"{repo.repo}-rest", date="2024")
+
+    async def get_latest_deployments(deployment, **kwargs):
+        return DeploymentVersion(
+            development_version=deployment.base_path,
+            development_date=None,
+            production_version=None,
+            production_date=None,
+        )
+
+    monkeypatch.setattr(graphql, "run_query", run_query)
+    monkeypatch.setattr(graphql, "get_latest_commit", get_latest_commit)
+    monkeypatch.setattr(graphql, "get_latest_deployments", get_latest_deployments)
+
+    commits, versions = asyncio.run(
+        graphql.get_latest_commits_and_deployments([API], DEPLOYMENTS)
+    )
+
+    assert [commit.commit for commit in commits] == ["api-rest"]
+    assert [version.development_version for version in versions] == [
+        "services/api/overlays",
+        "services/web/overlays",
+    ]
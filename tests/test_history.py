@@ -0,0 +1,84 @@
+import asyncio
+import importlib
+
+from app.models import Repository
+
+history = importlib.import_module("app.git.history")
+
+
+def commit(sha: str, date: str) -> dict:
+    return {"sha": sha, "commit": {"committer": {"date": date}}}
+
+
+class FakeHistory(history.HistoryIndex):
+    def __init__(self):
+        super().__init__(Repository(owner="acme", repo="cluster", branch="main"))
+        # Newest first, like the commits API
+        self.commits: list[dict] = []
+        self.files: dict[str, list[str]] = {}
+        self.fetched: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _commits(self, page: int) -> list[dict]:
+        start = (page - 1) * history.PAGE_SIZE
+        return self.commits[start : start + history.PAGE_SIZE]
+
+    async def _files(self, sha: str) -> list[str]:
+        self.fetched.append(sha)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.files[sha]
+
+
+def test_seed_incremental_and_reset():
+    index = FakeHistory()
+    index.commits = [
+        commit("c3", "2024-01-03T00:00:00Z"),
+        commit("c2", "2024-01-02T00:00:00Z"),
+        commit("c1", "2024-01-01T00:00:00Z"),
+    ]
+    index.files = {
+        "c1": ["api/development/kustomization.yaml"],
+        "c2": ["web/development/kustomization.yaml"],
+        "c3": ["api/development/kustomization.yaml"],
+    }
+
+    # The first sync indexes the recent window, fetching files concurrently
+    assert asyncio.run(index.sync()) == 3
+    assert index.max_running == 3
+    assert index.last_modified("api/development/kustomization.yaml") == (
+        "2024-01-03T00:00:00Z"
+    )
+    assert index.last_modified("web/development/kustomization.yaml") == (
+        "2024-01-02T00:00:00Z"
+    )
+    assert index.last_modified("api/production/kustomization.yaml") is None
+
+    # Then only the new commits are read
+    index.fetched.clear()
+    index.commits.insert(0, commit("c4", "2024-01-04T00:00:00Z"))
+    index.files["c4"] = ["web/development/kustomization.yaml"]
+    assert asyncio.run(index.sync()) == 1
+    assert index.fetched == ["c4"]
+    assert index.last_modified("web/development/kustomization.yaml") == (
+        "2024-01-04T00:00:00Z"
+    )
+    assert asyncio.run(index.sync()) == 0
+
+    # A rewritten history starts over from the new window
+    index.commits = [
+        commit("x2", "2024-02-02T00:00:00Z"),
+        commit("x1", "2024-02-01T00:00:00Z"),
+    ]
+    index.files.update(
+        {"x1": ["api/production/kustomization.yaml"], "x2": ["README.md"]}
+    )
+    assert asyncio.run(index.sync()) == 2
+    assert index.last_sha == "x2"
+    assert index.last_modified("web/development/kustomization.yaml") is None
+    assert index.last_modified("api/production/kustomization.yaml") == (
+        "2024-02-01T00:00:00Z"
+    )
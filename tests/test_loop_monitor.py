@@ -0,0 +1,69 @@
+import asyncio
+import importlib
+import threading
+import time
+
+import pytest
+
+monitor = importlib.import_module("app.utils.loop_monitor")
+
+
+def blocked_loop(monkeypatch):
+    monkeypatch.setattr(monitor, "LOOP_MONITOR", True)
+    monkeypatch.setattr(monitor, "LOOP_LAG_INTERVAL", 0.01)
+    monkeypatch.setattr(monitor, "LOOP_BLOCK_THRESHOLD", 0.05)
+    loop_monitor = monitor.LoopMonitor()
+
+    async def main():
+        loop_monitor.start()
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+        await loop_monitor.stop()
+        return loop_monitor.blocks_since(started)
+
+    return loop_monitor, asyncio.run(main())
+
+
+def test_stall_is_captured_once(monkeypatch):
+    loop_monitor, blocks = blocked_loop(monkeypatch)
+
+    assert len(blocks) == 1
+    assert blocks[0].duration >= 0.2
+    assert "time.sleep(0.3)" in blocks[0].stack
+    stats = loop_monitor.stats()
+    assert stats["blocked"] == 1
+    assert stats["max"] == loop_monitor.max_lag() >= 0.2
+
+
+def test_check_raises_only_in_strict_mode(monkeypatch):
+    loop_monitor, blocks = blocked_loop(monkeypatch)
+
+    loop_monitor.check("/get", blocks)
+    loop_monitor.check("/get", [])
+    monkeypatch.setattr(monitor, "LOOP_MONITOR_STRICT", True)
+    loop_monitor.check("/get", [])
+    with pytest.raises(monitor.LoopBlockedError, match="/get blocked"):
+        loop_monitor.check("/get", blocks)
+
+
+def test_readers_are_safe_while_the_watchdog_appends(monkeypatch):
+    loop_monitor = monitor.LoopMonitor()
+    stopped = threading.Event()
+
+    def watchdog():
+        while not stopped.is_set():
+            with loop_monitor._lock:
+                loop_monitor.blocks.append(monitor.Block(0.0, None, ""))
+            loop_monitor._beat(0.001)
+
+    thread = threading.Thread(target=watchdog)
+    thread.start()
+    try:
+        for _ in range(2000):
+            loop_monitor.stats()
+            loop_monitor.blocks_since(0.0)
+    finally:
+        stopped.set()
+        thread.join()
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import importlib
+import subprocess
+
+from app.models import Repository
+
+mirror = importlib.import_module("app.git.mirror")
+
+TOKEN = "ghp_mirror-secret"
+URL = "https://github.com/acme/cluster.git"
+
+
+def git(*args: str, cwd=None) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit(work, tag: str) -> None:
+    (work / "kustomization.yaml").write_text(f"newTag: {tag}\n")
+    git("add", ".", cwd=work)
+    git(
+        "-c", "user.name=test", "-c", "user.email=test@example.com",
+        "commit", "--quiet", "-m", tag, cwd=work,
+    )  # fmt: skip
+
+
+def test_sync_keeps_token_out_of_argv(tmp_path, monkeypatch):
+    monkeypatch.setenv("TZ", "UTC")
+    monkeypatch.setenv("GIT_COMMITTER_DATE", "2024-01-02T03:04:05Z")
+    # A local bare repository stands in for GitHub: the https URL is rewritten
+    # to it by the global config, the auth header goes along unused
+    origin = tmp_path / "origin.git"
+    work = tmp_path / "work"
+    git("init", "--bare", "--quiet", "--initial-branch=main", str(origin))
+    git("init", "--quiet", "--initial-branch=main", str(work))
+    commit(work, "v1")
+    git("push", "--quiet", str(origin), "main", cwd=work)
+
+    config = tmp_path / "gitconfig"
+    config.write_text(f'[url "file://{origin}"]\n\tinsteadOf = {URL}\n')
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(config))
+    monkeypatch.setattr(mirror, "GITHUB_TOKEN", TOKEN)
+
+    calls = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def spy(*args, **kwargs):
+        calls.append((args, kwargs.get("env") or {}))
+        return await create_subprocess_exec(*args, **kwargs)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spy)
+
+    cluster_mirror = mirror.ClusterMirror(
+        path=str(tmp_path / "mirror.git"),
+        url=URL,
+        repository=Repository(owner="acme", repo="cluster", branch="main"),
+    )
+    head = asyncio.run(cluster_mirror.sync())
+
+    assert head == git("rev-parse", "main", cwd=work)
+    credentials = base64.b64encode(f"x-access-token:{TOKEN}".encode()).decode()
+    for args, _ in calls:
+        assert not any(TOKEN in arg or credentials in arg for arg in args)
+    [fetch_env] = [env for args, env in calls if "fetch" in args]
+    assert fetch_env["GIT_CONFIG_VALUE_0"] == f"Authorization: Basic {credentials}"
+
+    async def read():
+        return (
+            await cluster_mirror.read_file("kustomization.yaml"),
+            await cluster_mirror.last_modified("kustomization.yaml"),
+            await cluster_mirror.read_file("missing.yaml"),
+            await cluster_mirror.last_modified("missing.yaml"),
+        )
+
+    assert asyncio.run(read()) == (
+        "newTag: v1\n",
+        "2024-01-02T03:04:05Z",
+        None,
+        None,
+    )
+
+    # Memoized lookups are dropped once the mirror moves to a new head
+    monkeypatch.setenv("GIT_COMMITTER_DATE", "2024-02-03T04:05:06Z")
+    commit(work, "v2")
+    git("push", "--quiet", str(origin), "main", cwd=work)
+    asyncio.run(cluster_mirror.sync())
+    assert asyncio.run(read())[:2] == ("newTag: v2\n", "2024-02-03T04:05:06Z")
@@ -0,0 +1,73 @@
+import asyncio
+import importlib
+import time
+
+from app.deployments import deployments
+from app.models import ALL_FIELDS, DeploymentVersion
+from app.state.store import DeploymentStore
+
+planner = importlib.import_module("app.state.planner")
+progressive = importlib.import_module("app.events.progressive")
+
+SLOW = 5
+DEADLINE = 0.3
+
+
+def test_slow_service_does_not_hold_back_the_others(monkeypatch):
+    fast, slow = [
+        next(d for d in deployments if d.package != deployments[0].package),
+        deployments[0],
+    ]
+    calls = {"graphql": 0}
+
+    async def get_latest_image(package):
+        await asyncio.sleep(SLOW if package == slow.package else 0.01)
+        return None
+
+    async def get_latest_commits_and_deployments(repositories, clusters, **kwargs):
+        calls["graphql"] += 1
+        version = DeploymentVersion(
+            development_version="v1",
+            development_date=None,
+            production_version="v1",
+            production_date=None,
+        )
+        return ([None] * len(repositories), [version] * len(clusters))
+
+    monkeypatch.setattr(planner, "get_latest_image", get_latest_image)
+    monkeypatch.setattr(
+        planner,
+        "get_latest_commits_and_deployments",
+        get_latest_commits_and_deployments,
+    )
+    store = DeploymentStore([fast, slow])
+    monkeypatch.setattr(progressive, "deployment_store", store)
+    monkeypatch.setattr(progressive, "SERVICE_DEADLINE", DEADLINE)
+    monkeypatch.setattr(progressive, "PROGRESS_UPDATE_INTERVAL", 0)
+
+    renders = []
+
+    def get_blocks(snapshot, status, page):
+        renders.append((time.monotonic(), dict(status)))
+        return [progressive.get_status_block([fast, slow], status)]
+
+    async def respond(**kwargs):
+        pass
+
+    async def main():
+        started = time.monotonic()
+        await progressive.render_progressively(respond, get_blocks, ALL_FIELDS)
+        elapsed = time.monotonic() - started
+        await store.stop()
+        return started, elapsed
+
+    started, elapsed = asyncio.run(main())
+
+    # Both services in one batch, a single GraphQL call
+    assert calls["graphql"] == 1
+    # The fast service is rendered as soon as it's complete
+    fast_done = next(at for at, status in renders if fast.id not in status)
+    assert fast_done - started < DEADLINE
+    # The slow one is shown as still loading at the deadline, not unavailable
+    assert renders[-1][1] == {slow.id: progressive.LATE}
+    assert DEADLINE <= elapsed < SLOW
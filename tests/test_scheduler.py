@@ -0,0 +1,151 @@
+import asyncio
+import importlib
+import time
+
+import httpx
+import pytest
+
+from app.utils.priority import background, join, spawn
+
+scheduler = importlib.import_module("app.git.scheduler")
+
+URL = "https://api.github.com/repos/acme/api/commits"
+
+
+def response(status: int, headers=None, json=None) -> httpx.Response:
+    return httpx.Response(
+        status,
+        headers=headers,
+        json=json,
+        request=httpx.Request("GET", URL, headers={"authorization": "token test"}),
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda a, b: 0)
+
+
+def test_backoff_ignores_other_statuses():
+    assert scheduler.Scheduler()._backoff(response(500), 0) is None
+    # A plain 403 is a permission error
+    assert (
+        scheduler.Scheduler()._backoff(
+            response(
+                403,
+                {"x-ratelimit-remaining": "4000"},
+                {"message": "Resource not accessible by integration"},
+            ),
+            0,
+        )
+        is None
+    )
+
+
+def test_backoff_primary_limit():
+    reset = time.time() + 10
+    delay = scheduler.Scheduler()._backoff(
+        response(403, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(reset)}),
+        0,
+    )
+    assert 9 < delay <= 10
+    # Past GITHUB_MAX_BACKOFF the caller gets the error instead of waiting
+    assert (
+        scheduler.Scheduler()._backoff(
+            response(
+                403,
+                {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(reset + 3600)},
+            ),
+            0,
+        )
+        is None
+    )
+
+
+def test_backoff_retry_after_and_429():
+    assert scheduler.Scheduler()._backoff(response(429, {"retry-after": "3"}), 0) == 3
+    assert scheduler.Scheduler()._backoff(response(429), 2) == 4
+
+
+def test_backoff_secondary_limit():
+    body = {
+        "message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again.",
+        "documentation_url": "https://docs.github.com/rest/overview/rate-limits-for-the-rest-api#about-secondary-rate-limits",
+    }
+    delay = scheduler.Scheduler()._backoff(
+        response(403, {"x-ratelimit-remaining": "4000"}, body), 0
+    )
+    assert delay == scheduler.GITHUB_SECONDARY_BACKOFF
+    delay = scheduler.Scheduler()._backoff(response(429, {"retry-after": "5"}, body), 0)
+    assert delay == scheduler.GITHUB_SECONDARY_BACKOFF
+
+
+def set_budget(instance, remaining: int, reset: float) -> httpx.Request:
+    limited = response(
+        200,
+        {
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset),
+        },
+    )
+    instance._update_budget(limited.request, limited)
+    return limited.request
+
+
+def test_wait_for_budget_spends_the_budget():
+    instance = scheduler.Scheduler()
+    request = set_budget(instance, 10, time.time() + 3600)
+    asyncio.run(instance._wait_for_budget(request))
+    [budget] = instance.rate_limits().values()
+    assert budget.remaining == 9
+
+
+def test_wait_for_budget_keeps_the_reserve_for_interactive_requests():
+    instance = scheduler.Scheduler()
+    request = set_budget(
+        instance, scheduler.GITHUB_RATE_LIMIT_RESERVE, time.time() + 3600
+    )
+
+    async def wait_in_background():
+        with background():
+            await instance._wait_for_budget(request)
+
+    with pytest.raises(RuntimeError, match="reserve reached"):
+        asyncio.run(wait_in_background())
+    # Interactive requests may use the reserve
+    asyncio.run(instance._wait_for_budget(request))
+
+
+def test_wait_for_budget_fails_fast_when_exhausted():
+    instance = scheduler.Scheduler()
+    request = set_budget(instance, 0, time.time() + 3600)
+    with pytest.raises(RuntimeError, match="rate limit exhausted"):
+        asyncio.run(instance._wait_for_budget(request))
+
+
+def test_wait_for_budget_waits_for_a_close_reset():
+    instance = scheduler.Scheduler()
+    request = set_budget(instance, 0, time.time() + 0.2)
+    started = time.monotonic()
+    asyncio.run(instance._wait_for_budget(request))
+    assert time.monotonic() - started >= 0.15
+    assert instance.throttled == 1
+
+
+def test_promoted_request_stops_waiting_for_the_reserve():
+    instance = scheduler.Scheduler()
+    request = set_budget(
+        instance, scheduler.GITHUB_RATE_LIMIT_RESERVE, time.time() + 30
+    )
+
+    async def main():
+        with background():
+            task = spawn(instance._wait_for_budget(request))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        # An interactive caller joining the background work promotes it
+        join(task)
+        await asyncio.wait_for(task, scheduler.PRIORITY_CHECK_INTERVAL + 1)
+
+    asyncio.run(main())
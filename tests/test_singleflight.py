@@ -0,0 +1,96 @@
+import asyncio
+import importlib
+
+from app.models import Package
+from app.utils.priority import BACKGROUND, INTERACTIVE, background, current_priority
+from app.utils.singleflight import coalesce
+
+singleflight = importlib.import_module("app.utils.singleflight")
+
+
+def test_same_call_is_coalesced(monkeypatch):
+    monkeypatch.setattr(singleflight, "flights", singleflight.SingleFlight())
+    calls = []
+
+    @coalesce
+    async def fetch(packages, drop=False):
+        calls.append((packages, drop))
+        call = len(calls)
+        await asyncio.sleep(0.01)
+        return call
+
+    async def main():
+        package = Package(image="a")
+        # Equal models, positional or keyword and defaulted arguments share a key
+        return await asyncio.gather(
+            fetch([package]),
+            fetch([Package(image="a")], False),
+            fetch(packages=[package], drop=False),
+            fetch([package], drop=True),
+        )
+
+    assert asyncio.run(main()) == [1, 1, 1, 2]
+    assert singleflight.flights.totals()["deduplicated"] == 2
+
+
+def test_methods_are_coalesced_per_instance(monkeypatch):
+    monkeypatch.setattr(singleflight, "flights", singleflight.SingleFlight())
+
+    class Source:
+        def __init__(self):
+            self.calls = 0
+
+        @coalesce
+        async def sync(self):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+
+    first, second = Source(), Source()
+
+    async def main():
+        await asyncio.gather(first.sync(), first.sync(), second.sync())
+
+    asyncio.run(main())
+    assert (first.calls, second.calls) == (1, 1)
+
+
+def test_cancelled_caller_leaves_the_flight_running(monkeypatch):
+    monkeypatch.setattr(singleflight, "flights", singleflight.SingleFlight())
+
+    @coalesce
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        impatient = asyncio.create_task(fetch())
+        patient = asyncio.create_task(fetch())
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient, impatient.cancelled()
+
+    assert asyncio.run(main()) == ("done", True)
+
+
+def test_interactive_caller_promotes_a_background_flight(monkeypatch):
+    monkeypatch.setattr(singleflight, "flights", singleflight.SingleFlight())
+    levels = []
+
+    @coalesce
+    async def fetch():
+        levels.append(current_priority())
+        await asyncio.sleep(0.02)
+        levels.append(current_priority())
+
+    async def refresh():
+        with background():
+            await fetch()
+
+    async def main():
+        started = asyncio.create_task(refresh())
+        await asyncio.sleep(0.01)
+        await fetch()
+        await started
+
+    asyncio.run(main())
+    assert levels == [BACKGROUND, INTERACTIVE]
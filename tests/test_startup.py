@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app import IMPORT_TIME_BUDGET
+from app.utils.startup import HEAVY_MODULES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Run in a fresh interpreter: this one already imported everything
+IMPORT_APP = """
+import json, sys
+import app.main
+from app.utils.startup import HEAVY_MODULES, startup_timings
+print(json.dumps({
+    "imports": startup_timings()["imports"],
+    "preloaded": [module for module in HEAVY_MODULES if module in sys.modules],
+}))
+"""
+
+
+def import_app() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_time_within_budget():
+    assert import_app()["imports"] <= IMPORT_TIME_BUDGET
+
+
+def test_heavy_modules_are_deferred():
+    assert HEAVY_MODULES
+    assert import_app()["preloaded"] == []
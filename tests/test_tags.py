@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+
+import httpx
+
+from app.models import Package
+
+tags = importlib.import_module("app.git.tags")
+packages = importlib.import_module("app.git.packages")
+
+PACKAGE = Package(image="api")
+
+
+def sha(n: int) -> str:
+    return f"{n:040x}"
+
+
+def version(id: int, *names: str) -> dict:
+    return {"id": id, "metadata": {"container": {"tags": list(names)}}}
+
+
+class FakeIndex(tags.TagIndex):
+    def __init__(self, max_size: int = tags.TAG_INDEX_SIZE):
+        super().__init__(PACKAGE, max_size)
+        # Newest first, like the packages API
+        self.versions: list[dict] = []
+        self.pages: list[int] = []
+
+    async def _page(self, page: int) -> list[dict]:
+        self.pages.append(page)
+        start = (page - 1) * tags.TAG_INDEX_PAGE_SIZE
+        return self.versions[start : start + tags.TAG_INDEX_PAGE_SIZE]
+
+
+def test_latest_is_the_highest_version_number():
+    index = FakeIndex()
+    index.versions = [
+        version(3, "v9", sha(9)),
+        version(2, "v10", sha(10)),
+        version(1, "v2", sha(2)),
+    ]
+    assert asyncio.run(index.sync()) == 3
+    assert index.latest().version == "v10"
+    assert index.latest().commit == sha(10)
+    assert index.commit_for("v9") == sha(9)
+
+
+def test_index_is_bounded(monkeypatch):
+    monkeypatch.setattr(tags, "TAG_INDEX_PAGE_SIZE", 2)
+    index = FakeIndex(max_size=3)
+    index.versions = [version(n, f"v{n}", sha(n)) for n in range(6, 0, -1)]
+    asyncio.run(index.sync())
+    assert len(index) == 3
+    assert index.latest().version == "v6"
+    assert index.commit_for("v4") == sha(4)
+    assert index.commit_for("v1") is None
+
+
+def test_sync_reads_new_versions_and_retags(monkeypatch):
+    monkeypatch.setattr(tags, "TAG_INDEX_PAGE_SIZE", 2)
+    index = FakeIndex()
+    index.versions = [version(n, f"v{n}", sha(n)) for n in range(4, 0, -1)]
+    assert asyncio.run(index.sync()) == 4
+
+    # Only the first page when nothing was published
+    index.pages.clear()
+    assert asyncio.run(index.sync()) == 0
+    assert index.pages == [1]
+
+    # The image for v5 is pushed with its commit tag, the version tag follows
+    index.versions.insert(0, version(5, sha(5)))
+    assert asyncio.run(index.sync()) == 1
+    assert index.latest().version == "v4"
+    index.versions[0] = version(5, sha(5), "v5")
+    assert asyncio.run(index.sync()) == 0
+    assert index.latest().version == "v5"
+    assert index.latest().commit == sha(5)
+
+
+def test_fallback_takes_the_commit_tag_of_the_latest_version(monkeypatch):
+    class UnavailableIndex:
+        async def sync(self):
+            request = httpx.Request("GET", "https://api.github.com/")
+            raise httpx.HTTPStatusError(
+                "Not Found", request=request, response=httpx.Response(404)
+            )
+
+    # Lexical order, like the registry: the last commit tag isn't the latest
+    listed = sorted(["v9", "v10", sha(10), sha(9), "latest", "ff" * 20])
+    digests = {"v10": "sha256:10", sha(10): "sha256:10", "v9": "sha256:9"}
+    digests.update({sha(9): "sha256:9", "ff" * 20: "sha256:ff"})
+
+    async def get_images(package):
+        return listed
+
+    async def get_digest(package, tag):
+        return digests.get(tag)
+
+    monkeypatch.setattr(packages, "get_tag_index", lambda package: UnavailableIndex())
+    monkeypatch.setattr(packages, "get_images", get_images)
+    monkeypatch.setattr(packages, "get_digest", get_digest)
+
+    latest = asyncio.run(packages.get_latest_image(PACKAGE))
+    assert latest.version == "v10"
+    assert latest.commit == sha(10)
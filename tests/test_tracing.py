@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from app.utils.tracing import Trace, TraceFile
+
+
+def finished_trace(name: str) -> Trace:
+    trace = Trace(name, {})
+    trace.root.end = trace.root.start + 0.01
+    return trace
+
+
+def test_trace_file_rolls_over(tmp_path):
+    path = tmp_path / "traces" / "traces.jsonl"
+    trace_file = TraceFile(str(path), max_bytes=1024)
+
+    async def write():
+        for i in range(21):
+            trace_file.write(finished_trace(f"/command{i}"))
+        await trace_file.close()
+
+    asyncio.run(write())
+
+    names = []
+    for file in (path.with_name("traces.jsonl.1"), path):
+        assert file.stat().st_size <= 1024 + 512
+        names += [json.loads(line)["name"] for line in file.read_text().splitlines()]
+    # Older traces were rolled over and dropped, the latest ones are kept in order
+    assert names == [f"/command{i}" for i in range(21)][-len(names) :]
+    assert len(names) < 21
+    assert trace_file.dropped == 0
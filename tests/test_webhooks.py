@@ -0,0 +1,41 @@
+import hashlib
+import hmac
+import importlib
+
+from fastapi.testclient import TestClient
+
+main = importlib.import_module("app.main")
+webhooks = importlib.import_module("app.state.webhooks")
+
+SECRET = "webhook-secret"
+
+
+def post(client: TestClient, body: bytes):
+    signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/github/webhooks",
+        content=body,
+        headers={
+            "X-GitHub-Event": "push",
+            "X-Hub-Signature-256": f"sha256={signature}",
+        },
+    )
+
+
+def test_github_webhook_payloads(monkeypatch):
+    monkeypatch.setattr(webhooks, "GITHUB_WEBHOOK_SECRET", SECRET)
+    events = []
+
+    async def handle_event(event, payload):
+        events.append((event, payload))
+
+    monkeypatch.setattr(main, "handle_event", handle_event)
+    client = TestClient(main.api)
+
+    response = post(client, b"{not json")
+    assert response.status_code == 400
+    assert events == []
+
+    response = post(client, b'{"ref": "refs/heads/main"}')
+    assert response.status_code == 200
+    assert events == [("push", {"ref": "refs/heads/main"})]